@@ -1,68 +1,67 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, image_names
-import json
-from datetime import datetime
-import time
-import threading
+from tkinter import ttk, messagebox, filedialog
 import os
-import base64
-import tempfile
-from PIL import Image
-import winsound  # For Windows sound
-import platform  # To check operating system
-# Try importing different notification libraries with fallbacks
-try:
-    from win10toast import ToastNotifier
-    from winotify import Notification, audio
-    WINDOWS_NOTIFICATIONS_AVAILABLE = True
-except ImportError:
-    WINDOWS_NOTIFICATIONS_AVAILABLE = False
-
-try:
-    from plyer import notification as plyer_notification
-    PLYER_AVAILABLE = True
-except ImportError:
-    PLYER_AVAILABLE = False
+import argparse
+import threading
+from recurrence import REPEAT_CHOICES, fire_minute
+from listview import VirtualNotificationList
+from engine import DEFAULT_PROFILE
+from profiles import open_profile, profile_paths, load_settings
+import bulkio
+import metrics
+from render_cache import RenderCache, NOTIFICATION_IMAGE_SIZE
+from records import to_record
+from search import NotificationIndex, SORT_ORDERS
+from audio import AudioPlayer
 
 class NotifierApp:
-    def __init__(self, root):
+    def __init__(self, root, engine, settings=None, profile=DEFAULT_PROFILE, audio=None):
+        """`engine` is a NotifierEngine running in-process or a NotifierClient
+        talking to a notifier daemon; the window only uses their shared API.
+        `settings` are the profile's default icon, image and sound; `audio`
+        plays sounds (shared with the engine when it runs in-process)."""
         self.root = root
-        self.root.title("Desktop Notifier")
+        self.engine = engine
+        self.audio = audio or AudioPlayer()
+        settings = settings or {}
+        if profile == DEFAULT_PROFILE:
+            self.root.title("Desktop Notifier")
+        else:
+            self.root.title(f"Desktop Notifier - {profile}")
         self.root.geometry("600x400")
 
         # Set default icon path
         self.icon_path = None
-        self.default_icon = "A:\Study-Store\Python\Icon.ico"
+        self.default_icon = settings.get("default_icon")
 
         # Add image path variable
         self.image_path = None
-        self.default_image = os.path.join("A:\Study-Store\Python\Icon.ico")  # Default notification image
+        self.default_image = settings.get("default_image") or self.default_icon
+        # Resized/converted images, reused whenever the same picture is picked again
+        self.render_cache = RenderCache()
 
         # Set default sound path
         self.sound_path = None
-        self.default_sound = "A:\Study-Store\Python\notification.wav"  # Default sound file
+        self.default_sound = settings.get("default_sound")
+        self.audio.preload([self.default_sound])
 
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        self.icon_path = None
-        self.default_icon = os.path.join(current_dir, "A:\Study-Store\Python\Icon.ico")
-        # Initialize Windows notification if available
-        if os.name == 'nt' and WINDOWS_NOTIFICATIONS_AVAILABLE:
-            try:
-                self.toaster = ToastNotifier()
-            except Exception:
-                self.toaster = None
         # Verify icon exists and is accessible
-        if not os.path.exists(self.default_icon):
+        if self.default_icon and not os.path.exists(self.default_icon):
             messagebox.showwarning("Warning", f"Default icon not found at: {self.default_icon}")
 
         # Try to set window icon
-        try:
-            self.root.iconbitmap(self.default_icon)
-        except tk.TclError:
-            pass
+        if self.default_icon:
+            try:
+                self.root.iconbitmap(self.default_icon)
+            except tk.TclError:
+                pass
 
-        # Load existing notifications from file
-        self.notifications = self.load_notifications()
+        # Notifications keyed by id, in creation order, as compact records
+        self.notifications = {notif["id"]: to_record(notif) for notif in self.load_notifications()}
+        # Built in the background after loading, then kept up to date with every edit
+        self.search_index = None
+        self._index_backlog = []  # (method, argument) edits made while it is built
+        self._filter_job = None
 
         # Create main frame
         self.main_frame = ttk.Frame(root, padding="10")
@@ -74,10 +73,6 @@ class NotifierApp:
         # Create notification list
         self.create_list()
 
-        # Start notification checker thread
-        self.checker_thread = threading.Thread(target=self.check_notifications, daemon=True)
-        self.checker_thread.start()
-
     def choose_sound(self):
         """Function to choose notification sound"""
         filetypes = [
@@ -92,26 +87,23 @@ class NotifierApp:
         if sound_path:
             self.sound_path = sound_path
             self.sound_label.config(text=os.path.basename(sound_path))
+            # The file may have been replaced since it was last played
+            self.audio.cache.invalidate(sound_path)
+            self.audio.preload([sound_path])
 
     def test_sound(self):
         """Function to test the selected sound"""
-        try:
-            if platform.system() == 'Windows':
-                sound_file = self.sound_path if self.sound_path else self.default_sound
-                winsound.PlaySound(sound_file, winsound.SND_FILENAME)
-            else:
-                messagebox.showinfo("Info", "Sound testing is only available on Windows")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to play sound: {str(e)}")
+        sound_file = self.sound_path if self.sound_path else self.default_sound
+        if not sound_file:
+            messagebox.showinfo("Info", "Choose a sound first")
+            return
+        # Plays on the audio pool; errors come back from its thread
+        self.audio.play(sound_file, on_error=lambda e: self.root.after(
+            0, lambda: messagebox.showerror("Error", f"Failed to play sound: {str(e)}")))
 
     def play_notification_sound(self):
         """Function to play notification sound"""
-        try:
-            if platform.system() == 'Windows':
-                sound_file = self.sound_path if self.sound_path else self.default_sound
-                winsound.PlaySound(sound_file, winsound.SND_FILENAME | winsound.SND_ASYNC)
-        except Exception as e:
-            print(f"Failed to play sound: {str(e)}")
+        self.audio.play(self.sound_path if self.sound_path else self.default_sound)
 
     def create_form(self):
         # Form frame
@@ -124,10 +116,10 @@ class NotifierApp:
         ttk.Entry(form_frame, textvariable=self.title_var).grid(row=0, column=1, sticky=(tk.W, tk.E))
 
         # Image selection
-        #ttk.Label(form_frame, text="Image:").grid(row=3, column=0, sticky=tk.W)
-        #self.image_label = ttk.Label(form_frame, text="No image selected")
-        #self.image_label.grid(row=3, column=1, sticky=tk.W)
-        #ttk.Button(form_frame, text="Choose Image", command=self.choose_image).grid(row=3, column=2, padx=5)
+        ttk.Label(form_frame, text="Image:").grid(row=3, column=0, sticky=tk.W)
+        self.image_label = ttk.Label(form_frame, text="No image selected")
+        self.image_label.grid(row=3, column=1, sticky=tk.W)
+        ttk.Button(form_frame, text="Choose Image", command=self.choose_image).grid(row=3, column=2, padx=5)
 
         # Message
         ttk.Label(form_frame, text="Message:").grid(row=1, column=0, sticky=tk.W)
@@ -139,13 +131,20 @@ class NotifierApp:
         self.time_var = tk.StringVar()
         ttk.Entry(form_frame, textvariable=self.time_var).grid(row=2, column=1, sticky=(tk.W, tk.E))
 
+        # Repeat rule
+        ttk.Label(form_frame, text="Repeat:").grid(row=5, column=0, sticky=tk.W)
+        self.repeat_var = tk.StringVar(value="daily")
+        ttk.Combobox(form_frame, textvariable=self.repeat_var, values=REPEAT_CHOICES).grid(row=5, column=1, sticky=(tk.W, tk.E))
+
         # Buttons
         btn_frame = ttk.Frame(form_frame)
-        btn_frame.grid(row=4, column=0, columnspan=3, pady=10)
+        btn_frame.grid(row=6, column=0, columnspan=3, pady=10)
 
         ttk.Button(btn_frame, text="Create", command=self.create_notification).grid(row=0, column=0, padx=5)
         ttk.Button(btn_frame, text="Update", command=self.update_notification).grid(row=0, column=1, padx=5)
         ttk.Button(btn_frame, text="Delete", command=self.delete_notification).grid(row=0, column=2, padx=5)
+        ttk.Button(btn_frame, text="Import", command=self.import_notifications).grid(row=0, column=3, padx=5)
+        ttk.Button(btn_frame, text="Export", command=self.export_notifications).grid(row=0, column=4, padx=5)
 
     def choose_icon(self):
         filetypes = [
@@ -160,15 +159,13 @@ class NotifierApp:
 
         if icon_path:
             self.icon_path = icon_path
-            self.icon_label.config(text=os.path.basename(icon_path))
+            self.image_path = icon_path
+            self.image_label.config(text=os.path.basename(icon_path))
 
             # Convert icon to ICO if it's a PNG
             if icon_path.lower().endswith('.png'):
                 try:
-                    img = Image.open(image_names())
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.ico') as tmp_file:
-                        img.save(tmp_file.name, format='ICO')
-                        self.image_path = tmp_file.name
+                    self.image_path = self.render_cache.render(icon_path, "ico")
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to convert image: {str(e)}")
                     self.image_path = None
@@ -179,29 +176,47 @@ class NotifierApp:
         list_frame = ttk.LabelFrame(self.main_frame, text="Notifications", padding="10")
         list_frame.grid(row=1, column=0, padx=5, pady=5, sticky=(tk.W, tk.E))
 
-        # Treeview
-        columns = ('title', 'message', 'time', 'image')
-        self.tree = ttk.Treeview(list_frame, columns=columns, show='headings')
-
-        # Define headings
-        self.tree.heading('title', text='Title')
-        self.tree.heading('message', text='Message')
-        self.tree.heading('time', text='Time')
-        #self.tree.heading('image', text='image')
-
-        # Column widths
-        self.tree.column('title', width=150)
-        self.tree.column('message', width=250)
-        self.tree.column('time', width=100)
-        #self.tree.column('image', width=100)
-
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        # Search and filters; the list shows only the matching rows
+        search_frame = ttk.Frame(list_frame)
+        search_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 5))
+        self.search_var = tk.StringVar()
+        self.time_from_var = tk.StringVar()
+        self.time_to_var = tk.StringVar()
+        self.image_filter_var = tk.StringVar(value="Any")
+        self.sort_var = tk.StringVar(value=SORT_ORDERS[0])
+        ttk.Label(search_frame, text="Search:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Entry(search_frame, textvariable=self.search_var, width=20).grid(row=0, column=1, padx=(0, 5))
+        ttk.Label(search_frame, text="From:").grid(row=0, column=2, sticky=tk.W)
+        ttk.Entry(search_frame, textvariable=self.time_from_var, width=6).grid(row=0, column=3)
+        ttk.Label(search_frame, text="To:").grid(row=0, column=4, sticky=tk.W)
+        ttk.Entry(search_frame, textvariable=self.time_to_var, width=6).grid(row=0, column=5, padx=(0, 5))
+        ttk.Combobox(search_frame, textvariable=self.image_filter_var, width=9, state="readonly",
+                     values=("Any", "With image", "No image")).grid(row=0, column=6, padx=(0, 5))
+        ttk.Label(search_frame, text="Sort:").grid(row=0, column=7, sticky=tk.W)
+        ttk.Combobox(search_frame, textvariable=self.sort_var, width=8, state="readonly",
+                     values=SORT_ORDERS).grid(row=0, column=8)
+        self.index_status = ttk.Label(search_frame, text="")
+        self.index_status.grid(row=0, column=9, sticky=tk.W, padx=(5, 0))
+        for var in (self.search_var, self.time_from_var, self.time_to_var, self.image_filter_var, self.sort_var):
+            var.trace_add("write", self.schedule_filter)
+
+        # Treeview that only renders the visible rows
+        columns = [
+            ('title', 'Title', 150),
+            ('message', 'Message', 250),
+            ('time', 'Time', 100),
+            ('repeat', 'Repeat', 100),
+        ]
+        self.list_view = VirtualNotificationList(list_frame, columns, self.row_values)
+        self.list_view.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.tree = self.list_view.tree
 
         # Bind selection event
-        self.tree.bind('<<TreeviewSelect>>', self.item_selected)
+        self.list_view.bind_select(self.item_selected)
 
         # Load existing notifications
         self.refresh_list()
+        self.build_search_index()
 
     def choose_image(self):
         """Function to choose notification image"""
@@ -216,30 +231,8 @@ class NotifierApp:
 
         if image_path:
             try:
-                # Open and validate the image
-                img = Image.open(image_path)
-
-                # Create temporary directory if it doesn't exist
-                temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
-                os.makedirs(temp_dir, exist_ok=True)
-
-                # Convert to PNG and resize if necessary
-                # Windows notifications work best with images around 364x180 pixels
-                img = img.convert('RGBA')
-                aspect_ratio = img.width / img.height
-                if aspect_ratio > 2:  # wider than 2:1
-                    new_width = 364
-                    new_height = int(new_width / aspect_ratio)
-                else:
-                    new_height = 180
-                    new_width = int(new_height * aspect_ratio)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-                # Save as temporary PNG file
-                temp_image_path = os.path.join(temp_dir, 'temp_notification.png')
-                img.save(temp_image_path, 'PNG')
-
-                self.image_path = temp_image_path
+                # Convert to PNG and resize to fit the notification; cached per image
+                self.image_path = self.render_cache.render(image_path, "png", NOTIFICATION_IMAGE_SIZE)
                 self.image_label.config(text=os.path.basename(image_path))
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to process image: {str(e)}")
@@ -250,37 +243,14 @@ class NotifierApp:
         title = self.title_var.get().strip()
         message = self.message_var.get().strip()
         time_str = self.time_var.get().strip()
+        repeat = self.repeat_var.get().strip() or "daily"
 
-        if not all([title, message, time_str]):
-            messagebox.showerror("Error", "All fields are required!")
-            return
-
-        try:
-            datetime.strptime(time_str, "%H:%M")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid time format! Use HH:MM")
-            return
-
-        image_data = None
-        if self.image_path and os.path.exists(self.image_path):
-            try:
-                with open(self.image_path, 'rb') as img_file:
-                    image_data = base64.b64encode(img_file.read()).decode('utf-8')
-            except Exception as e:
-                messagebox.showwarning("Warning", f"Failed to load image: {str(e)}")
-
-        # If icon is selected, encode it to base64
-        image_data = None
+        # If an image is selected, the engine stores it once and keeps its hash
         if self.image_path and os.path.exists(self.image_path):
             try:
-                img = Image.open(self.image_path)
                 # Save as ICO if it's not already
                 if not self.image_path.lower().endswith('.ico'):
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.ico') as tmp_file:
-                        img.save(tmp_file.name, format='ICO')
-                        self.image_path = tmp_file.name
-                with open(self.image_path, 'rb') as image_data:
-                    image_data = base64.b64encode(image_data.read()).decode('utf-8')
+                    self.image_path = self.render_cache.render(self.image_path, "ico")
             except Exception as e:
                 messagebox.showwarning("Warning", f"Failed to load image: {str(e)}")
                 self.image_path = None
@@ -288,124 +258,25 @@ class NotifierApp:
             "title": title,
             "message": message,
             "time": time_str,
-            "image": image_data
+            "repeat": repeat,
+            "image_path": self.image_path
         }
 
-        self.notifications.append(notification_data)
-        self.save_notifications()
-        self.refresh_list()
+        notification_data = self.save_notification(self.engine.create_notification, notification_data)
+        if notification_data is None:
+            return
+        notification_data = to_record(notification_data)
+        self.notifications[notification_data["id"]] = notification_data
+        self.show_changed([notification_data])
         self.clear_form()
 
-    def send_notification(self, title, message, image_path=None, sound_path=None):
-        if os.name == 'nt' and WINDOWS_NOTIFICATIONS_AVAILABLE:
-            try:
-                # Try using winotify first as it has better image support
-                toast = Notification(
-                    app_id="NotifierApp",
-                    title=title,
-                    msg=message,
-                    icon=self.default_icon,  # Use icon for the app icon
-                    duration="long"
-                )
-
-                # Add image if available
-                if image_path and os.path.exists(image_path):
-                    toast.add_icon(image_path)
-
-                if sound_path:
-                    toast.set_audio(audio.Default, loop=False)
-
-                toast.show()
-            except Exception as e:
-                print(f"Winotify error: {str(e)}")
-                # Fallback to win10toast (note: won't show image)
-                try:
-                    if hasattr(self, 'toaster') and self.toaster:
-                        self.toaster.show_toast(
-                            title=title,
-                            msg=message,
-                            image_path=self.default_image,
-                            duration=10,
-                            threaded=True
-                        )
-                except Exception as e:
-                    print(f"Win10toast error: {str(e)}")
-                    messagebox.showerror("Error", f"Failed to send notification: {str(e)}")
-
-                #set custom sound if provided
-                if sound_path:
-                   toast.set_audio(audio.Default,loop=False)
-                toast.show()
-            except Exception as e:
-                messagebox.showerror("Error",f"Failed to send notification: {str(e)}")
-
-            except Exception:
-                try:
-                    toast = Notification(
-                        app_id="NotifierApp",
-                        title=title,
-                        msg=message,
-                        image=image_path or self.default_image,
-                        duration="long"
-                    )
-                    toast.show()
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to send notification: {str(e)}")
-        elif PLYER_AVAILABLE:
-            try:
-                plyer_notification.notify(
-                    title=title,
-                    message=message,
-                    app_image=image_path or self.default_image,
-                    timeout=10
-                )
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to send notification: {str(e)}")
-        else:
-            messagebox.showwarning("Warning", "No notification system available")
-
-    def check_notifications(self):
-        while True:
-            current_time = datetime.now().strftime("%H:%M")
-            for notif in self.notifications:
-                if notif["time"] == current_time:
-                    image_path = None
-                    if notif.get("image"):
-                        try:
-                            # Create temp directory if it doesn't exist
-                            temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
-                            os.makedirs(temp_dir, exist_ok=True)
-
-                            # Save the image data to a temporary file
-                            image_data = base64.b64decode(notif["image"])
-                            temp_image_path = os.path.join(temp_dir, f'notification_image_{int(time.time())}.png')
-                            with open(temp_image_path, 'wb') as img_file:
-                                img_file.write(image_data)
-                            image_path = temp_image_path
-                        except Exception as e:
-                            print(f"Failed to process notification image: {str(e)}")
-                            image_path = None
-
-                    self.send_notification(
-                        notif["title"],
-                        notif["message"],
-                        image_path,
-                        notif.get("sound", self.default_sound)
-                    )
-                    self.send_notification(notif["title"], notif["message"], image_path)
-
-                    # Clean up temporary image file
-                    if image_path and os.path.exists(image_path):
-                        try:
-                            os.unlink(image_path)
-                        except Exception as e:
-                            print(f"Failed to clean up temporary image: {str(e)}")
-
-            time.sleep(30)  # Check every 30 seconds
+    def dispatch_failed(self, job, error):
+        """Called from a dispatch worker; error dialogs must be shown on the Tk thread"""
+        self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to send notification: {str(error)}"))
 
     def delete_notification(self):
-        selected = self.tree.selection()
-        if not selected:
+        notification_id = self.list_view.selected_id()
+        if notification_id not in self.notifications:
             messagebox.showwarning("Warning", "Please select a notification to delete!")
             return
 
@@ -413,115 +284,281 @@ class NotifierApp:
         if not confirm:
             return
 
-        index = self.tree.index(selected[0])
-        self.notifications.pop(index)
-        self.save_notifications()
-        self.refresh_list()
+        if self.save_notification(self.engine.delete_notification, notification_id) is None:
+            return
+        del self.notifications[notification_id]
+        self.update_index("remove", notification_id)
+        self.list_view.remove(notification_id)
         self.clear_form()
 
     def update_notification(self):
-        selected = self.tree.selection()
-        if not selected:
+        notification_id = self.list_view.selected_id()
+        if notification_id not in self.notifications:
             messagebox.showwarning("Warning", "Please select a notification to update!")
             return
 
-        index = self.tree.index(selected[0])
         title = self.title_var.get().strip()
         message = self.message_var.get().strip()
         time_str = self.time_var.get().strip()
+        repeat = self.repeat_var.get().strip() or "daily"
 
-        if not all([title, message, time_str]):
-            messagebox.showerror("Error", "All fields are required!")
-            return
-
-        try:
-            datetime.strptime(time_str, "%H:%M")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid time format! Use HH:MM")
-            return
-
-        image_data = None
-        if self.image_path and os.path.exists(self.image_path):
-            try:
-                with open(self.image_path, 'rb') as image_file:
-                    image_data = base64.b64encode(image_file.read()).decode('utf-8')
-            except Exception as e:
-                messagebox.showwarning("Warning", f"Failed to load icon: {str(e)}")
-
-        self.notifications[index] = {
+        notification_data = {
             "title": title,
             "message": message,
             "time": time_str,
-            #"image": image_data
+            "repeat": repeat
         }
+        if self.image_path and os.path.exists(self.image_path):
+            notification_data["image_path"] = self.image_path
 
-        self.save_notifications()
-        self.refresh_list()
+        notification_data = self.save_notification(
+            lambda data: self.engine.update_notification(notification_id, data), notification_data)
+        if notification_data is None:
+            return
+        notification_data = to_record(notification_data)
+        self.notifications[notification_id] = notification_data
+        self.show_changed([notification_data])
         self.clear_form()
 
     def item_selected(self, event):
-        selected = self.tree.selection()
-        if selected:
-            index = self.tree.index(selected[0])
-            notification = self.notifications[index]
+        notification = self.notifications.get(self.list_view.selected_id())
+        if notification:
             self.title_var.set(notification["title"])
             self.message_var.set(notification["message"])
             self.time_var.set(notification["time"])
+            self.repeat_var.set(notification.get("repeat", "daily"))
 
-            if notification.get("image"):
-                try:
-                    image_data = base64.b64decode(notification["image"])
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.ico') as tmp_file:
-                        tmp_file.write(image_data)
-                        self.image_path = tmp_file.name
-                        self.image_label.config(text="Saved image")
-                except Exception:
-                    self.image_path = None
-                    self.image_label.config(text="No image selected")
+            image_path = self.engine.image_path(notification.get("image_hash"))
+            if image_path:
+                self.image_path = image_path
+                self.image_label.config(text="Saved image")
             else:
                 self.image_path = None
                 self.image_label.config(text="No image selected")
 
     def clear_form(self):
+        self.list_view.clear_selection()
         self.title_var.set("")
         self.message_var.set("")
         self.time_var.set("")
+        self.repeat_var.set("daily")
         self.image_path = None
         self.image_label.config(text="No image selected")
 
-    def refresh_list(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def row_values(self, notification):
+        return (
+            notification["title"],
+            notification["message"],
+            notification["time"],
+            notification.get("repeat", "daily"),
+            #"Yes" if notification.get("image_hash") else "No"
+        )
 
-        for notification in self.notifications:
-            self.tree.insert('', tk.END, values=(
-                notification["title"],
-                notification["message"],
-                notification["time"],
-                #"Yes" if notification.get("image") else "No"
-            ))
+    def refresh_list(self):
+        """Reload every row; single edits go through list_view.upsert/remove"""
+        if self.filter_active():
+            self.apply_filter()
+        else:
+            self.list_view.set_items(list(self.notifications.values()))
+
+    def filter_active(self):
+        return bool(self.search_var.get().strip() or self.time_from_var.get().strip()
+                    or self.time_to_var.get().strip() or self.image_filter_var.get() != "Any"
+                    or self.sort_var.get() != SORT_ORDERS[0])
+
+    def schedule_filter(self, *args):
+        """Re-run the search shortly after the last keystroke"""
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(150, self.apply_filter)
+
+    def apply_filter(self):
+        self._filter_job = None
+        if not self.filter_active():
+            self.list_view.set_items(list(self.notifications.values()))
+            return
+        if self.search_index is None:
+            # Filtered once the index is ready (see search_index_ready)
+            self.list_view.set_items([])
+            return
+        has_image = {"With image": True, "No image": False}.get(self.image_filter_var.get())
+        # Half-typed times are ignored until they parse
+        ids = self.search_index.query(
+            self.search_var.get(),
+            fire_minute(self.time_from_var.get().strip()),
+            fire_minute(self.time_to_var.get().strip()),
+            has_image,
+            self.sort_var.get()
+        )
+        self.list_view.set_items([self.notifications[notification_id] for notification_id in ids])
+
+    def show_changed(self, notifications):
+        """Show created or edited notifications, respecting the current filter"""
+        self.update_index("add_many", notifications)
+        if self.filter_active():
+            self.apply_filter()
+        elif len(notifications) == 1:
+            self.list_view.upsert(notifications[0])
+        else:
+            self.list_view.extend(notifications)
+
+    def build_search_index(self):
+        """Index the loaded notifications on a background thread"""
+        records = list(self.notifications.values())
+        self.index_status.config(text="Indexing...")
+
+        def run():
+            index = NotificationIndex(records)
+            self.root.after(0, self.search_index_ready, index)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def search_index_ready(self, index):
+        for method, argument in self._index_backlog:
+            getattr(index, method)(argument)
+        self._index_backlog = []
+        self.search_index = index
+        self.index_status.config(text="")
+        if self.filter_active():
+            self.apply_filter()
+
+    def update_index(self, method, argument):
+        """Apply an edit to the search index, or hold it until the index is built"""
+        if self.search_index is None:
+            self._index_backlog.append((method, argument))
+        else:
+            getattr(self.search_index, method)(argument)
 
     def load_notifications(self):
         try:
-            if os.path.exists("notifications.json"):
-                with open("notifications.json", "r") as f:
-                    return json.load(f)
+            return self.engine.list_notifications()
         except Exception as e:
             messagebox.showwarning("Warning", f"Failed to load notifications: {str(e)}")
         return []
 
-    def save_notifications(self):
+    def import_notifications(self):
+        """Function to import notifications from a CSV or JSON Lines file"""
+        filetypes = [
+            ('CSV files', '*.csv'),
+            ('JSON Lines files', '*.jsonl *.ndjson'),
+            ('All files', '*.*')
+        ]
+        path = filedialog.askopenfilename(title="Import notifications", filetypes=filetypes)
+        if not path:
+            return
+
+        def run():
+            # Batches are saved here; the list is refreshed once per batch on the Tk thread
+            try:
+                imported, errors = bulkio.import_file(
+                    self.engine, path,
+                    on_batch=lambda created: self.root.after(0, self.add_imported, created)
+                )
+            except Exception as e:
+                error = str(e)
+                self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to import notifications: {error}"))
+                return
+            summary = f"Imported {imported} notifications"
+            if errors:
+                summary += f", skipped {len(errors)} invalid rows"
+                summary += "".join(f"\nLine {line_num}: {error}" for line_num, error in errors[:10])
+            self.root.after(0, lambda: messagebox.showinfo("Import", summary))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def add_imported(self, created):
+        created = [to_record(notif) for notif in created]
+        for notif in created:
+            self.notifications[notif["id"]] = notif
+        self.show_changed(created)
+
+    def export_notifications(self):
+        """Function to export every notification to a CSV or JSON Lines file"""
+        filetypes = [
+            ('CSV files', '*.csv'),
+            ('JSON Lines files', '*.jsonl'),
+        ]
+        path = filedialog.asksaveasfilename(title="Export notifications", filetypes=filetypes,
+                                            defaultextension='.csv')
+        if not path:
+            return
         try:
-            with open("notifications.json", "w") as f:
-                json.dump(self.notifications, f)
-                print(self.notifications)
+            count = bulkio.export_file(self.notifications.values(), path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export notifications: {str(e)}")
+            return
+        messagebox.showinfo("Export", f"Exported {count} notifications")
+
+    def save_notification(self, operation, data):
+        """Run an engine create/update/delete, reporting failures in a dialog.
+
+        Returns the operation's result, or None if it failed.
+        """
+        try:
+            return operation(data)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save notifications: {str(e)}")
+        return None
 
 def main():
+    parser = argparse.ArgumentParser(description="Desktop Notifier")
+    parser.add_argument("--connect", metavar="ADDRESS",
+                        help="use a running notifier daemon (http://host:port or a Unix socket path)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE,
+                        help="profile whose notifications and settings to use")
+    parser.add_argument("--metrics-port", type=int,
+                        help="collect metrics and serve them at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-dump", metavar="PATH", help="collect metrics and write them as JSON to PATH")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="schedule and deliver on an asyncio event loop driven by the Tk mainloop")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    NotifierApp(root)
-    root.mainloop()
+    if args.connect:
+        from daemon import NotifierClient
+        client = NotifierClient(args.connect, profile=args.profile)
+        app = NotifierApp(root, client, client.settings(), args.profile)
+        root.mainloop()
+        app.audio.stop()
+        return
+
+    settings = load_settings(profile_paths(args.profile)["settings"])
+    runtime = None
+    if args.asyncio:
+        import asyncio
+        from aio_engine import AsyncRuntime, pump_tk
+        loop = asyncio.new_event_loop()
+        pump_tk(root, loop)
+        runtime = AsyncRuntime(default_icon=settings.get("default_icon"),
+                               default_image=settings.get("default_image"), loop=loop)
+    audio = AudioPlayer()
+    engine = open_profile(args.profile, runtime=runtime, audio=audio)
+    app = NotifierApp(root, engine, settings, args.profile, audio)
+    engine.on_failure = app.dispatch_failed
+    metrics_server = dumper = None
+    if args.metrics_port or args.metrics_dump:
+        metrics.REGISTRY.enable()
+    if args.metrics_port:
+        metrics_server = metrics.serve(port=args.metrics_port)
+    if args.metrics_dump:
+        dumper = metrics.JsonDumper(args.metrics_dump)
+        dumper.start()
+    engine.start()
+    if runtime:
+        runtime.start()
+    try:
+        root.mainloop()
+    finally:
+        if runtime:
+            runtime.stop()
+        engine.stop()
+        audio.stop()
+        if dumper:
+            dumper.stop()
+        if metrics_server:
+            metrics_server.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,328 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from dispatch import DispatchQueue, DispatchTimeout, is_awaitable
+from engine import NotifierRuntime, DISPATCH_WORKERS
+from scheduler import NotificationScheduler
+
+# Most deliveries in flight at once; async backends aren't limited by threads
+CONCURRENCY = 100
+# How often the Tk mainloop runs the event loop's ready callbacks, in ms
+TK_PUMP_INTERVAL = 20
+
+
+def _on_loop_thread(loop):
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def run_coroutine(loop, coro, timeout=None):
+    """Run `coro` on `loop` from any thread and wait for it.
+
+    Works whether the loop runs on another thread or isn't running at all
+    (e.g. a Tk-pumped loop after the mainloop returned). On the loop's own
+    thread it can't wait, so the coroutine is only started.
+    """
+    if loop.is_closed():
+        coro.close()
+        return None
+    if _on_loop_thread(loop):
+        loop.create_task(coro)
+        return None
+    if loop.is_running():
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+    return loop.run_until_complete(coro)
+
+
+class LoopTimer:
+    """A loop.call_later() that may be started and cancelled from any thread"""
+
+    def __init__(self, loop, delay, callback):
+        self.loop = loop
+        self._handle = None
+        self._cancelled = False
+        loop.call_soon_threadsafe(self._arm, delay, callback)
+
+    def _arm(self, delay, callback):
+        if not self._cancelled:
+            self._handle = self.loop.call_later(delay, callback)
+
+    def cancel(self):
+        self._cancelled = True
+        handle = self._handle
+        if handle is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(handle.cancel)
+
+
+class AsyncScheduler(NotificationScheduler):
+    """NotificationScheduler driven by an event loop timer instead of a thread.
+
+    One loop timer is armed for the earliest deadline (at most MAX_WAIT away,
+    so clock jumps are still noticed) and re-armed whenever it may have
+    moved. Due occurrences are fired in `executor`, as firing reads the
+    ledger and the image store; one batch runs at a time, in order.
+    """
+
+    def __init__(self, on_fire, loop, executor, clock=time.time, on_wake=None):
+        super().__init__(on_fire, clock=clock, on_wake=on_wake)
+        self.loop = loop
+        self.executor = executor
+        self._handle = None
+        self._arm_pending = False
+        self._busy = False
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._changed()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+        handle = self._handle
+        if handle is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(handle.cancel)
+
+    def run(self):
+        raise RuntimeError("AsyncScheduler runs on its event loop; call start()")
+
+    def _changed(self):
+        # Any thread may schedule; the timer itself is only touched on the loop
+        if self._running and not self._arm_pending:
+            self._arm_pending = True
+            self.loop.call_soon_threadsafe(self._arm)
+
+    def _arm(self):
+        with self._cond:
+            self._arm_pending = False
+            if not self._running:
+                return
+            self._drop_stale()
+            deadline = self._heap[0][0] if self._heap else None
+        if self._handle is not None:
+            self._handle.cancel()
+        delay = self.MAX_WAIT if deadline is None else min(deadline - self.clock(), self.MAX_WAIT)
+        self._handle = self.loop.call_later(max(0.0, delay), self._tick)
+
+    def _tick(self):
+        self._handle = None
+        if self._busy or not self._running:
+            return  # the running batch re-arms the timer when it finishes
+        self._busy = True
+        self.loop.run_in_executor(self.executor, self._fire_due).add_done_callback(self._fired)
+
+    def _fire_due(self):
+        if self.on_wake:
+            try:
+                self.on_wake(self.clock())
+            except Exception as e:
+                print(f"Scheduler wake hook failed: {str(e)}")
+        with metrics.SCHEDULER_TICK.time():
+            for key, occurrence in self.pop_due():
+                try:
+                    self.on_fire(key, occurrence)
+                except Exception as e:
+                    print(f"Failed to fire notification {key}: {str(e)}")
+
+    def _fired(self, future):
+        self._busy = False
+        self._arm()
+
+
+class AsyncDispatchQueue(DispatchQueue):
+    """DispatchQueue that delivers as tasks on an event loop instead of worker threads.
+
+    Up to `concurrency` jobs are in flight at once. Async backends are awaited
+    on the loop; plain ones run in `executor`. Timeouts cancel the await (a
+    thread already running a plain backend is abandoned, as before). Delivery
+    callbacks write the ledger, so they run in `callback_executor`.
+    """
+
+    def __init__(self, backends, loop, executor, callback_executor, concurrency=CONCURRENCY,
+                 maxsize=1000, retries=2, backoff=1.0, on_failure=None, remember=10000,
+                 on_delivered=None):
+        super().__init__(backends, workers=0, maxsize=maxsize, retries=retries, backoff=backoff,
+                         on_failure=on_failure, remember=remember, on_delivered=on_delivered)
+        self.loop = loop
+        self.executor = executor
+        self.callback_executor = callback_executor
+        self.concurrency = concurrency
+        self.maxsize = maxsize
+        self._pending = 0
+        self._tasks = set()
+        self._semaphore = None
+
+    def start(self):
+        pass  # nothing to start; jobs become tasks as they arrive
+
+    def stop(self, timeout=None):
+        """Let jobs in flight finish (up to `timeout` seconds), then refuse new ones"""
+        self._stopped = True
+        run_coroutine(self.loop, self.drain(timeout))
+
+    async def drain(self, timeout=None):
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    def qsize(self):
+        return self._pending
+
+    def _enqueue(self, job):
+        with self._lock:
+            if self._pending >= self.maxsize:
+                return False
+            self._pending += 1
+        self.loop.call_soon_threadsafe(self._spawn, job)
+        return True
+
+    def _spawn(self, job):
+        task = self.loop.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._semaphore:
+                if job.queued_at is not None:
+                    metrics.QUEUE_WAIT.observe(time.perf_counter() - job.queued_at)
+                try:
+                    backend_name = await self.deliver_async(job)
+                except Exception as e:
+                    await self.loop.run_in_executor(self.callback_executor, self._finish, job, None, e)
+                    return
+                await self.loop.run_in_executor(self.callback_executor, self._finish, job, backend_name)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def deliver_async(self, job):
+        """Deliver `job` like deliver(), without blocking the loop"""
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            for index, backend in enumerate(self.backends):
+                if backend.limiter and not backend.unavailable():
+                    waited = 0.0
+                    delay = backend.limiter.try_acquire()
+                    while delay:
+                        await asyncio.sleep(delay)
+                        waited += delay
+                        delay = backend.limiter.try_acquire()
+                    metrics.RATE_LIMIT_WAIT.observe(waited, backend=backend.name)
+                start = time.perf_counter()
+                try:
+                    try:
+                        await asyncio.wait_for(self._send(backend, job), backend.timeout)
+                    except asyncio.TimeoutError:
+                        raise DispatchTimeout(f"timed out after {backend.timeout}s")
+                except Exception as e:
+                    self._record_attempt(backend, index, start, e)
+                    last_error = e
+                    continue
+                self._record_attempt(backend, index, start)
+                return backend.name
+        raise last_error or RuntimeError("No notification system available")
+
+    async def _send(self, backend, job):
+        if backend.is_async:
+            result = backend.send(job)
+        else:
+            result = await self.loop.run_in_executor(self.executor, backend.send, job)
+        # A wrapper such as LazyBackend may only find out it is async when called
+        if is_awaitable(result):
+            result = await result
+        return result
+
+
+class AsyncRuntime(NotifierRuntime):
+    """NotifierRuntime whose scheduling and delivery run on one asyncio event loop.
+
+    The scheduler is a loop timer and deliveries are tasks, so thousands of
+    reminders and concurrent deliveries cost no extra threads. Firing and
+    delivery bookkeeping (ledger, image store) run in a single I/O thread;
+    plain, blocking backends in a pool of `workers` threads created on
+    demand.
+
+    Without a `loop` the runtime runs its own on a background thread. Pass
+    a loop to share one the application already drives, e.g. the Tk
+    mainloop via pump_tk().
+    """
+
+    def __init__(self, backends=None, workers=DISPATCH_WORKERS, clock=None,
+                 default_icon=None, default_image=None, loop=None, concurrency=CONCURRENCY):
+        self._owns_loop = loop is None
+        self.loop = loop or asyncio.new_event_loop()
+        self.concurrency = concurrency
+        self.io_executor = ThreadPoolExecutor(1, thread_name_prefix="notifier-io")
+        self.backend_executor = ThreadPoolExecutor(workers, thread_name_prefix="notifier-backend")
+        self._thread = None
+        super().__init__(backends, workers, clock, default_icon, default_image)
+
+    def _create_dispatcher(self, backends, workers):
+        return AsyncDispatchQueue(backends, self.loop, self.backend_executor, self.io_executor,
+                                  concurrency=self.concurrency, on_failure=self._failed,
+                                  on_delivered=self._delivered)
+
+    def _create_scheduler(self):
+        return AsyncScheduler(self._fire, self.loop, self.io_executor, clock=self.clock,
+                              on_wake=self._wake)
+
+    def call_later(self, delay, callback):
+        return LoopTimer(self.loop, delay, callback)
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        if self._owns_loop:
+            self._thread = threading.Thread(target=self.loop.run_forever, daemon=True,
+                                            name="notifier-loop")
+            self._thread.start()
+        self.scheduler.start()
+
+    def stop(self):
+        """Stop firing, send pending summaries, let deliveries finish and stop the loop"""
+        self.scheduler.stop()
+        # A fire batch still running in the I/O thread may submit more jobs
+        run_coroutine(self.loop, self._settle())
+        for engine in list(self.engines.values()):
+            engine.flush()
+        self.dispatcher.stop(timeout=5)
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self._thread = None
+        if self._owns_loop and not self.loop.is_running():
+            self.loop.close()
+        self.io_executor.shutdown(wait=True)
+        self.backend_executor.shutdown(wait=False)
+
+    async def _settle(self):
+        await self.loop.run_in_executor(self.io_executor, lambda: None)
+
+
+def pump_tk(root, loop, interval=TK_PUMP_INTERVAL):
+    """Drive `loop` from the Tk mainloop of `root`.
+
+    Every `interval` ms the loop runs one iteration: ready callbacks, due
+    timers and finished I/O. Everything then happens on the Tk thread, so
+    loop callbacks may touch widgets directly.
+    """
+    def step():
+        if loop.is_closed():
+            return
+        loop.call_soon(loop.stop)
+        loop.run_forever()
+        root.after(interval, step)
+
+    root.after(0, step)
@@ -0,0 +1,215 @@
+import io
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Decoded sounds kept in memory before the least recently used are dropped
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Sounds bigger than this are refused rather than cached
+MAX_SOUND_BYTES = 8 * 1024 * 1024
+# Sounds playing at once, and how many more may wait for a free slot
+PLAYBACK_WORKERS = 2
+MAX_QUEUED = 4
+
+
+class Sound:
+    """A WAV file read and checked once, played from memory afterwards"""
+
+    __slots__ = ("path", "data", "channels", "sample_width", "frame_rate", "duration")
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        try:
+            with wave.open(io.BytesIO(data), "rb") as wav:
+                self.channels = wav.getnchannels()
+                self.sample_width = wav.getsampwidth()
+                self.frame_rate = wav.getframerate()
+                self.duration = wav.getnframes() / float(self.frame_rate)
+        except (wave.Error, EOFError, ZeroDivisionError):
+            raise ValueError(f"Not a PCM WAV file: {path}")
+
+
+def load_sound(path):
+    size = os.path.getsize(path)
+    if size > MAX_SOUND_BYTES:
+        raise ValueError(f"Sound file too large ({size // 1024} KB): {path}")
+    with open(path, "rb") as f:
+        return Sound(path, f.read())
+
+
+class SoundCache:
+    """Sounds by path, bounded by total size with LRU eviction.
+
+    Files are read once; later plays don't touch the disk. Call invalidate()
+    when a file is known to have changed.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sounds = OrderedDict()  # path -> Sound, least recently used first
+        self._total = 0
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            sound = self._sounds.get(path)
+            if sound is not None:
+                self._sounds.move_to_end(path)
+                self.hits += 1
+                return sound
+            self.misses += 1
+        sound = load_sound(path)
+        with self._lock:
+            if path not in self._sounds:
+                self._sounds[path] = sound
+                self._total += len(sound.data)
+                while self._total > self.max_bytes and len(self._sounds) > 1:
+                    _, evicted = self._sounds.popitem(last=False)
+                    self._total -= len(evicted.data)
+        return sound
+
+    def invalidate(self, path):
+        with self._lock:
+            sound = self._sounds.pop(os.path.abspath(path), None)
+            if sound is not None:
+                self._total -= len(sound.data)
+
+
+class WinsoundSink:
+    """winsound.PlaySound straight from the in-memory WAV (SND_MEMORY)"""
+
+    name = "winsound"
+
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+
+    def play(self, sound):
+        # SND_MEMORY can't be combined with SND_ASYNC; this blocks a playback worker only
+        self._winsound.PlaySound(sound.data, self._winsound.SND_MEMORY)
+
+
+class PipeSink:
+    """Feeds the WAV to a player command on stdin, e.g. paplay or aplay"""
+
+    def __init__(self, command):
+        self.command = list(command)
+        self.name = os.path.basename(self.command[0])
+
+    def play(self, sound):
+        subprocess.run(self.command, input=sound.data, check=True, capture_output=True,
+                       timeout=sound.duration + 5)
+
+
+class NullSink:
+    """Plays nothing; records what would have played. For headless hosts and tests.
+
+    With `realtime` each play takes as long as the sound would.
+    """
+
+    name = "null"
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.played = []
+
+    def play(self, sound):
+        self.played.append(sound.path)
+        if self.realtime:
+            time.sleep(sound.duration)
+
+
+def default_sink(platform=None):
+    """The first sink that works here, falling back to NullSink"""
+    platform = platform or sys.platform
+    if platform.startswith("win"):
+        try:
+            return WinsoundSink()
+        except ImportError:
+            pass
+    for command in (["paplay"], ["aplay", "-q", "-"]):
+        path = shutil.which(command[0])
+        if path:
+            return PipeSink([path] + command[1:])
+    return NullSink()
+
+
+class AudioPlayer:
+    """Plays sounds on a small pool of threads without blocking the caller.
+
+    At most `workers` sounds play at once and `max_queued` more may wait;
+    beyond that, and for a sound that is already playing or queued, play()
+    is skipped instead of piling up. Sounds come from a SoundCache, so a
+    file is read from disk only the first time (or by preload()).
+    """
+
+    def __init__(self, sink=None, workers=PLAYBACK_WORKERS, max_queued=MAX_QUEUED, cache=None):
+        self.sink = sink or default_sink()
+        self.cache = cache or SoundCache()
+        self.max_active = workers + max_queued
+        self._lock = threading.Lock()
+        self._active = set()  # paths playing or waiting to
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="notifier-audio")
+
+    def play(self, path, on_error=None):
+        """Queue `path` for playback; returns False if it was skipped.
+
+        Load and playback errors go to `on_error(error)` (on a playback
+        thread), or are printed.
+        """
+        if not path:
+            return False
+        with self._lock:
+            if path in self._active or len(self._active) >= self.max_active:
+                return False
+            self._active.add(path)
+        queued_at = time.perf_counter()
+        try:
+            self._executor.submit(self._play, path, queued_at, on_error)
+        except RuntimeError:  # stopped
+            with self._lock:
+                self._active.discard(path)
+            return False
+        return True
+
+    def preload(self, paths):
+        """Read `paths` into the cache in the background"""
+        paths = [path for path in dict.fromkeys(paths) if path]
+        if paths:
+            threading.Thread(target=self._preload, args=(paths,), daemon=True).start()
+
+    def stop(self, wait=False):
+        self._executor.shutdown(wait=wait)
+
+    def _preload(self, paths):
+        for path in paths:
+            try:
+                self.cache.get(path)
+            except Exception as e:
+                print(f"Failed to load sound {path}: {str(e)}")
+
+    def _play(self, path, queued_at, on_error):
+        try:
+            sound = self.cache.get(path)
+            metrics.SOUND_LATENCY.observe(time.perf_counter() - queued_at, sink=self.sink.name)
+            self.sink.play(sound)
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            else:
+                print(f"Failed to play sound: {str(e)}")
+        finally:
+            with self._lock:
+                self._active.discard(path)
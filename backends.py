@@ -0,0 +1,195 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from dispatch import Backend
+
+# Comma-separated backend names overriding the platform defaults, e.g. "log"
+BACKENDS_ENV = "NOTIFIER_BACKENDS"
+
+
+class BackendSpec:
+    """A registered delivery backend.
+
+    `factory(settings)` imports whatever library the backend needs and returns
+    the send callable; it runs on first use, not at import time. `platforms`
+    are sys.platform prefixes the backend applies to (None means any).
+    `rate` and `burst` cap calls per second (see dispatch.Backend).
+    """
+
+    def __init__(self, name, factory, platforms=None, timeout=10.0, rate=None, burst=1):
+        self.name = name
+        self.factory = factory
+        self.platforms = platforms
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+
+    def supports(self, platform):
+        return self.platforms is None or platform.startswith(tuple(self.platforms))
+
+
+class LazyBackend:
+    """Send callable that builds the real backend on its first delivery.
+
+    If the library can't be imported the backend stays unavailable and every
+    call fails fast, so the dispatcher falls through to the next backend.
+    """
+
+    def __init__(self, spec, settings):
+        self.spec = spec
+        self.settings = settings
+        self._impl = None
+        self._error = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._impl is None and self._error is None:
+                try:
+                    self._impl = self.spec.factory(self.settings)
+                except Exception as e:
+                    self._error = e
+            if self._error is not None:
+                raise RuntimeError(f"{self.spec.name} unavailable: {str(self._error)}")
+            return self._impl
+
+    @property
+    def failed(self):
+        return self._error is not None
+
+    def __call__(self, job):
+        return self.load()(job)
+
+
+REGISTRY = []
+
+
+def register_backend(name, factory, platforms=None, timeout=10.0, rate=None, burst=1):
+    """Add a backend; platform defaults use registration order as fallback order"""
+    REGISTRY.append(BackendSpec(name, factory, platforms, timeout, rate, burst))
+
+
+def default_backends(default_icon=None, default_image=None, platform=None, names=None):
+    """Delivery backends for this platform, in fallback order.
+
+    Nothing is imported here; each backend loads its library on first use.
+    `names` (or the NOTIFIER_BACKENDS environment variable) picks backends
+    explicitly instead of by platform.
+    """
+    platform = platform or sys.platform
+    if names is None and os.environ.get(BACKENDS_ENV):
+        names = [name.strip() for name in os.environ[BACKENDS_ENV].split(",") if name.strip()]
+    settings = {"default_icon": default_icon, "default_image": default_image}
+    if names is not None:
+        by_name = {spec.name: spec for spec in REGISTRY}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown notification backend: {unknown[0]}")
+        specs = [by_name[name] for name in names]
+    else:
+        specs = [spec for spec in REGISTRY if spec.supports(platform)]
+    return [Backend(spec.name, LazyBackend(spec, settings), spec.timeout, spec.rate, spec.burst)
+            for spec in specs]
+
+
+def preload(backends):
+    """Import every backend library now (instead of on first notification)"""
+    for backend in backends:
+        try:
+            backend.send.load()
+        except Exception as e:
+            print(str(e))
+
+
+def winotify_backend(settings):
+    """winotify toasts; has the best image support on Windows"""
+    from winotify import Notification, audio
+    default_icon = settings.get("default_icon")
+
+    def send(job):
+        toast = Notification(
+            app_id="NotifierApp",
+            title=job.title,
+            msg=job.message,
+            icon=job.icon_path or default_icon,  # Use icon for the app icon
+            duration="long"
+        )
+
+        # Add image if available
+        if job.image_path and os.path.exists(job.image_path):
+            toast.add_icon(job.image_path)
+
+        if job.silent:
+            # The engine's audio player plays the sound; don't play a second one
+            toast.set_audio(audio.Silent, loop=False)
+        elif job.sound_path:
+            toast.set_audio(audio.Default, loop=False)
+
+        toast.show()
+    return send
+
+
+def win10toast_backend(settings):
+    """win10toast fallback (note: won't show the notification image)"""
+    from win10toast import ToastNotifier
+    toaster = ToastNotifier()
+    default_icon = settings.get("default_icon")
+
+    def send(job):
+        toaster.show_toast(
+            title=job.title,
+            msg=job.message,
+            icon_path=job.icon_path or default_icon,
+            duration=10,
+            threaded=True
+        )
+    return send
+
+
+def notify_send_backend(settings):
+    """libnotify via the notify-send command (desktop Linux, D-Bus session)"""
+    command = shutil.which("notify-send")
+    if command is None:
+        raise RuntimeError("notify-send not found")
+
+    def send(job):
+        args = [command, "--app-name=NotifierApp"]
+        icon = job.image_path or job.default_image or settings.get("default_image")
+        if icon and os.path.exists(icon):
+            args.append(f"--icon={icon}")
+        args += ["--", job.title, job.message]
+        subprocess.run(args, check=True, capture_output=True, timeout=10)
+    return send
+
+
+def plyer_backend(settings):
+    from plyer import notification as plyer_notification
+    default_image = settings.get("default_image")
+
+    def send(job):
+        plyer_notification.notify(
+            title=job.title,
+            message=job.message,
+            app_icon=job.image_path or job.default_image or default_image,
+            timeout=10
+        )
+    return send
+
+
+def log_backend(settings):
+    """Prints the notification; last-resort fallback on headless hosts and in tests"""
+    def send(job):
+        print(f"[notification] {job.title}: {job.message}", flush=True)
+    return send
+
+
+# Desktop backends: at most one toast a second after a burst of five
+register_backend("winotify", winotify_backend, platforms=["win32"], timeout=10, rate=1, burst=5)
+register_backend("win10toast", win10toast_backend, platforms=["win32"], timeout=15, rate=1, burst=5)
+register_backend("notify-send", notify_send_backend, platforms=["linux", "freebsd"], timeout=10,
+                 rate=1, burst=5)
+register_backend("plyer", plyer_backend, timeout=10, rate=1, burst=5)
+register_backend("log", log_backend, timeout=1)
@@ -0,0 +1,335 @@
+"""Load test for the scheduler, storage, dispatch and list paths.
+
+Runs without a display or real notification backends: delivery goes to an
+in-memory fake backend, the scheduler is driven by a virtual clock and the
+list benchmark uses a stand-in Treeview. Results are printed and written as
+JSON so runs can be compared over time.
+
+    python benchmarks/bench_engine.py [--sizes 1000 10000 100000] [--json out.json]
+
+Each dataset size runs in its own interpreter so peak memory is per size.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dispatch import Backend  # noqa: E402
+from engine import NotifierEngine  # noqa: E402
+from listview import VirtualNotificationList  # noqa: E402
+
+
+class VirtualClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """Records the wall time each job was delivered"""
+
+    def __init__(self):
+        self.delivered = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, job):
+        with self.lock:
+            self.delivered[job.key] = time.perf_counter()
+
+
+class FakeTreeview:
+    """Just enough of ttk.Treeview for VirtualNotificationList"""
+
+    def __init__(self):
+        self.items = {}
+        self.order = []
+        self.selected = ()
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+            self.order.remove(iid)
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def move(self, iid, parent, index):
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def insert(self, parent, index, iid, values):
+        self.items[iid] = values
+        self.order.insert(index, iid)
+
+    def item(self, iid, values):
+        self.items[iid] = values
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, *items):
+        self.selected = items
+
+    def see(self, iid):
+        pass
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        pass
+
+
+class HeadlessList(VirtualNotificationList):
+    def _build(self, parent, columns):
+        self.frame = None
+        self.tree = FakeTreeview()
+        self.scrollbar = FakeScrollbar()
+
+
+# Single-edit timings taken per dataset
+SAMPLES = 50
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def make_notifications(count):
+    repeats = ("daily", "weekdays", "weekly:mon,thu")
+    return [{
+        "title": f"Reminder {i}",
+        "message": f"Benchmark message number {i}",
+        "time": f"{(i // 60) % 24:02d}:{i % 60:02d}",
+        "repeat": repeats[i % len(repeats)],
+    } for i in range(count)]
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values) * 1000, 4),
+        "p50_ms": round(pick(0.50) * 1000, 4),
+        "p95_ms": round(pick(0.95) * 1000, 4),
+        "p99_ms": round(pick(0.99) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4),
+    }
+
+
+def bench_persistence(workdir, size, storage):
+    """Store costs with writes reaching the store synchronously (write_delay=0),
+    plus the write-behind path: the journal append an edit waits for and the
+    flush that later applies the batch"""
+    path = os.path.join(workdir, f"bench-{size}.{storage}")
+    data = make_notifications(size)
+    engine = NotifierEngine(path, os.path.join(workdir, "images"), backends=[],
+                            ledger_path=os.path.join(workdir, "ledger.jsonl"), legacy_json_path=None,
+                            write_delay=0)
+    start = time.perf_counter()
+    created = engine.create_notifications(data)
+    bulk_write = time.perf_counter() - start
+
+    # Single-row edits, the cost of pressing Update in the window
+    edited = created[:: max(1, size // SAMPLES)]
+    samples = []
+    for notif in edited:
+        start = time.perf_counter()
+        engine.update_notification(notif["id"], {"title": notif["title"] + " (edited)"})
+        samples.append(time.perf_counter() - start)
+    engine.stop()
+
+    start = time.perf_counter()
+    engine = NotifierEngine(path, os.path.join(workdir, "images"), backends=[],
+                            ledger_path=os.path.join(workdir, "ledger.jsonl"), legacy_json_path=None,
+                            write_delay=0)
+    load_time = time.perf_counter() - start
+    engine.stop()
+
+    # The same edits through the write-behind journal, then the batched write
+    engine = NotifierEngine(path, os.path.join(workdir, "images"), backends=[],
+                            ledger_path=os.path.join(workdir, "ledger.jsonl"), legacy_json_path=None,
+                            write_delay=60)
+    journal_samples = []
+    for notif in edited:
+        start = time.perf_counter()
+        engine.update_notification(notif["id"], {"title": notif["title"] + " (again)"})
+        journal_samples.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    engine.store.flush()
+    flush_time = time.perf_counter() - start
+    engine.stop()
+    return {
+        "bulk_create_s": round(bulk_write, 4),
+        "single_update": percentiles(samples),
+        "load_and_schedule_s": round(load_time, 4),
+        "journal_update": percentiles(journal_samples),
+        "journal_flush_s": round(flush_time, 4),
+    }
+
+
+def bench_fire_latency(workdir, size, workers, window_hours):
+    """Drive the scheduler through `window_hours` of virtual time"""
+    start_ts = datetime(2026, 1, 5).timestamp()  # a Monday at midnight
+    clock = VirtualClock(start_ts)
+    backend = FakeBackend()
+    engine = NotifierEngine(os.path.join(workdir, f"fire-{size}.db"), os.path.join(workdir, "images"),
+                            backends=[Backend("fake", backend, timeout=None)], workers=workers, clock=clock,
+                            ledger_path=os.path.join(workdir, f"fire-{size}.jsonl"), legacy_json_path=None,
+                            coalesce_window=0)  # measure per-reminder delivery, not the window
+    engine.create_notifications(make_notifications(size))
+    engine.dispatcher.start()
+
+    released = {}  # job key -> wall time the virtual clock reached it
+
+    def fire(key, occurrence):
+        profile, notification_id = key
+        released[(notification_id, occurrence)] = tick_started
+        engine.fire_notification(notification_id, occurrence)
+
+    tick_costs = []
+    end_ts = start_ts + window_hours * 3600
+    while True:
+        deadline = engine.scheduler.next_deadline()
+        if deadline is None or deadline > end_ts:
+            break
+        clock.now = deadline
+        tick_started = time.perf_counter()
+        due = engine.scheduler.pop_due()
+        for key, occurrence in due:
+            fire(key, occurrence)
+        tick_costs.append((time.perf_counter() - tick_started) / max(1, len(due)))
+    engine.dispatcher._queue.join()
+    engine.stop()
+
+    latencies = [backend.delivered[key] - released[key] for key in released if key in backend.delivered]
+    return {
+        "virtual_hours": window_hours,
+        "fired": len(released),
+        "delivered": len(backend.delivered),
+        "fire_latency": percentiles(latencies),
+        "scheduler_cost_per_fire": percentiles(tick_costs),
+    }
+
+
+def bench_list(size):
+    notifs = [dict(n, id=f"n{i}") for i, n in enumerate(make_notifications(size))]
+    view = HeadlessList(None, [], lambda n: (n["title"], n["message"], n["time"], n["repeat"]))
+    start = time.perf_counter()
+    view.set_items(notifs)
+    full = time.perf_counter() - start
+
+    samples = []
+    for notif in notifs[:: max(1, size // SAMPLES)]:
+        edited = dict(notif, title=notif["title"] + " (edited)")
+        start = time.perf_counter()
+        view.upsert(edited)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        view.scroll(view.height)
+    scroll = (time.perf_counter() - start) / 100
+    return {
+        "full_refresh_s": round(full, 4),
+        "rendered_rows": len(view.tree.items),
+        "single_update": percentiles(samples),
+        "page_scroll_ms": round(scroll * 1000, 4),
+    }
+
+
+def run_size(workdir, size, args):
+    result = {"size": size}
+    for storage in args.storage:
+        result[f"persistence_{storage}"] = bench_persistence(workdir, size, storage)
+    result["fire"] = bench_fire_latency(workdir, size, args.workers, args.hours)
+    result["list"] = bench_list(size)
+    result["peak_memory_mb"] = peak_memory_mb()
+    return result
+
+
+def run_size_in_child(size, args):
+    command = [sys.executable, os.path.abspath(__file__), "--child", str(size),
+               "--workers", str(args.workers), "--hours", str(args.hours), "--storage", *args.storage]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scheduler, storage, dispatch and list paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--storage", nargs="+", default=["db", "json"], choices=["db", "json"],
+                        help="store backends to measure (by file extension)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--hours", type=float, default=24, help="virtual time to simulate")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        workdir = tempfile.mkdtemp(prefix="notifier-bench-")
+        try:
+            print(json.dumps(run_size(workdir, args.child, args)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return
+
+    results = []
+    for size in args.sizes:
+        result = run_size_in_child(size, args)
+        results.append(result)
+        print(f"{size:>7} reminders: "
+              f"fire p99 {result['fire']['fire_latency'].get('p99_ms')} ms, "
+              f"list update p99 {result['list']['single_update'].get('p99_ms')} ms, "
+              f"peak {result['peak_memory_mb']} MB")
+        for storage in args.storage:
+            persistence = result[f"persistence_{storage}"]
+            print(f"        {storage:4}: bulk create {persistence['bulk_create_s']} s, "
+                  f"update p50 {persistence['single_update']['p50_ms']} ms, "
+                  f"load {persistence['load_and_schedule_s']} s, "
+                  f"journaled update p50 {persistence['journal_update']['p50_ms']} ms, "
+                  f"flush {persistence['journal_flush_s']} s")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
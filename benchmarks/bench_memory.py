@@ -0,0 +1,112 @@
+"""Resident memory per reminder: notification dicts versus NotificationRecords.
+
+Builds the same reminders three ways, each parsed from JSON the way they are
+loaded, and reports the bytes still allocated per reminder (tracemalloc):
+
+  * legacy dicts, with the base64 image inline as notifications.json had it,
+  * dicts with an "image_hash" reference, as the store returns them,
+  * NotificationRecords, as the engine and the window keep them now.
+
+It also checks that every record converts back to the exact dict it came from.
+
+    python benchmarks/bench_memory.py [--count 100000] [--json results.json]
+"""
+import argparse
+import base64
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import to_record  # noqa: E402
+
+TITLES = ("Take medication", "Standup", "Drink water", "Stretch", "Pay rent", "Call mom",
+          "Review PRs", "Backup", "Water plants", "Lunch")
+REPEATS = ("daily", "weekdays", "weekly:mon,thu", "once:2026-12-24")
+IMAGE_BYTES = 3 * 1024
+IMAGES = 20
+
+
+def generate(count, seed=1):
+    """Reminders in the stored format, plus the inline image each one references"""
+    rng = random.Random(seed)
+    images = {}
+    for _ in range(IMAGES):
+        data = base64.b64encode(rng.randbytes(IMAGE_BYTES)).decode("ascii")
+        images[f"{rng.getrandbits(128):032x}"] = data
+    hashes = list(images)
+    notifications = []
+    for i in range(count):
+        notif = {
+            "id": f"{rng.getrandbits(128):032x}",
+            "title": rng.choice(TITLES),
+            "message": f"Reminder number {i}",
+            "time": f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            "repeat": rng.choice(REPEATS),
+        }
+        if i % 5 == 0:
+            notif["image_hash"] = rng.choice(hashes)
+        notifications.append(notif)
+    return notifications, images
+
+
+def legacy_text(notifications, images):
+    legacy = []
+    for notif in notifications:
+        notif = dict(notif)
+        image_hash = notif.pop("image_hash", None)
+        if image_hash:
+            notif["image"] = images[image_hash]
+        legacy.append(notif)
+    return json.dumps(legacy)
+
+
+def measure(build):
+    """Bytes allocated by the object `build()` returns, once everything else is freed"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    notifications, images = generate(args.count)
+    text = json.dumps(notifications)
+    legacy = legacy_text(notifications, images)
+
+    results = {}
+    scenarios = {
+        "legacy dicts (inline image)": lambda: json.loads(legacy),
+        "dicts (image_hash)": lambda: json.loads(text),
+        "NotificationRecord": lambda: [to_record(notif) for notif in json.loads(text)],
+    }
+    for name, build in scenarios.items():
+        built, size = measure(build)
+        results[name] = {"bytes_per_reminder": round(size / args.count, 1), "total_mb": round(size / 2 ** 20, 2)}
+        print(f"{name:30} {results[name]['bytes_per_reminder']:10.1f} B/reminder "
+              f"{results[name]['total_mb']:10.2f} MB total")
+        if name == "NotificationRecord":
+            lossless = [dict(record) for record in built] == notifications
+            print(f"{'round trip to dicts':30} {'lossless' if lossless else 'MISMATCH'}")
+            results[name]["lossless"] = lossless
+        del built
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "count": args.count, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Startup import latency: lazy backend loading versus importing everything up front.
+
+Each scenario runs in a fresh interpreter several times and the median wall
+time is reported, along with the slowest modules from `python -X importtime`.
+
+    python benchmarks/bench_startup.py [--runs 7] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # What the app and the daemon import at startup now
+    "engine (lazy backends)": "import engine",
+    "gui (lazy backends)": "import Task_Notifier",
+    # The old behaviour: every backend library and Pillow imported up front
+    "engine + eager backends": (
+        "import engine, backends\n"
+        "backends.preload(backends.default_backends(names=[s.name for s in backends.REGISTRY]))\n"
+        "try:\n    import PIL.Image\nexcept ImportError:\n    pass"
+    ),
+}
+
+
+def run_once(code):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, result.stderr
+
+
+def slowest_imports(importtime_output, top=5):
+    """Parse `-X importtime` lines: 'import time: self | cumulative | name'"""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in SCENARIOS.items():
+        try:
+            timings = []
+            for _ in range(args.runs):
+                elapsed, importtime = run_once(code)
+                timings.append(elapsed)
+        except RuntimeError as e:
+            print(f"{name:28} skipped ({str(e)})")
+            continue
+        results[name] = {
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "min_ms": round(min(timings) * 1000, 2),
+            "slowest_imports": [{"module": module, "cumulative_us": us}
+                                for us, module in slowest_imports(importtime)],
+        }
+        print(f"{name:28} median {results[name]['median_ms']:8.2f} ms   min {results[name]['min_ms']:8.2f} ms")
+        for entry in results[name]["slowest_imports"]:
+            print(f"    {entry['module']:30} {entry['cumulative_us'] / 1000:8.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "platform": sys.platform, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Stress test: edit notifications from several threads while the scheduler fires.
+
+Writer threads create, update and delete reminders through the engine as
+fast as they can while a firing thread drives the scheduler through virtual
+days and readers keep listing snapshots. At the end it checks that
+
+  * no thread raised,
+  * every snapshot a reader saw was internally consistent,
+  * no (notification, occurrence) was fired twice,
+  * nothing was fired for a notification that no snapshot contained,
+  * the store on disk matches the final snapshot.
+
+    python benchmarks/stress_repository.py [--seconds 5] [--writers 4]
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dispatch import Backend  # noqa: E402
+from engine import NotifierEngine  # noqa: E402
+from storage import open_store  # noqa: E402
+
+
+class VirtualClock:
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def random_notification(rng):
+    return {
+        "title": f"Reminder {rng.randrange(10 ** 6)}",
+        "message": "stress",
+        "time": f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+        "repeat": rng.choice(("daily", "weekdays", "weekly:mon,thu")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent edit/fire stress test for the engine")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--initial", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="notifier-stress-")
+    clock = VirtualClock(datetime(2026, 1, 5).timestamp())
+    engine = NotifierEngine(os.path.join(workdir, "stress.db"), os.path.join(workdir, "images"),
+                            backends=[Backend("null", lambda job: None, timeout=None)], clock=clock,
+                            ledger_path=os.path.join(workdir, "ledger.jsonl"), legacy_json_path=None,
+                            coalesce_window=0)
+    fired = []
+    errors = []
+    seen_ids = set()
+    seen_lock = threading.Lock()
+    stop = threading.Event()
+    counts = {"creates": 0, "updates": 0, "deletes": 0, "snapshots": 0}
+
+    def record(snapshot):
+        with seen_lock:
+            seen_ids.update(snapshot)
+
+    engine.dispatcher.start()
+    engine.create_notifications([random_notification(random.Random(i)) for i in range(args.initial)])
+    record(engine.notifications)
+
+    def guarded(target):
+        def run():
+            try:
+                target()
+            except Exception as e:
+                errors.append(f"{threading.current_thread().name}: {e!r}")
+                stop.set()
+        return run
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            ids = list(engine.notifications)
+            action = rng.random()
+            if action < 0.4 or not ids:
+                created = engine.create_notifications([random_notification(rng) for _ in range(rng.randint(1, 5))])
+                with seen_lock:
+                    seen_ids.update(notif["id"] for notif in created)
+                counts["creates"] += len(created)
+            elif action < 0.8:
+                try:
+                    engine.update_notification(rng.choice(ids), random_notification(rng))
+                    counts["updates"] += 1
+                except KeyError:
+                    pass  # deleted by another writer in the meantime
+            else:
+                counts["deletes"] += engine.delete_notifications(rng.sample(ids, min(len(ids), 3)))
+
+    def reader():
+        while not stop.is_set():
+            snapshot = engine.notifications
+            values = snapshot.values()
+            if len(values) != len(snapshot):
+                raise AssertionError(f"snapshot {snapshot.version}: {len(values)} values, len {len(snapshot)}")
+            for notif in values:
+                if snapshot.get(notif["id"]) is not notif:
+                    raise AssertionError(f"snapshot {snapshot.version} changed while being read")
+            record(snapshot)
+            counts["snapshots"] += 1
+
+    def firer():
+        while not stop.is_set():
+            deadline = engine.scheduler.next_deadline()
+            if deadline is None:
+                time.sleep(0.001)
+                continue
+            clock.now = max(clock.now, deadline)
+            for key, occurrence in engine.scheduler.pop_due():
+                fired.append((key[1], occurrence))
+                engine.fire_notification(key[1], occurrence)
+
+    threads = [threading.Thread(target=guarded(lambda seed=i: writer(seed)), name=f"writer-{i}")
+               for i in range(args.writers)]
+    threads += [threading.Thread(target=guarded(reader), name=f"reader-{i}") for i in range(args.readers)]
+    threads.append(threading.Thread(target=guarded(firer), name="firer"))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    final = {notif["id"]: notif for notif in engine.list_notifications()}
+    record(engine.notifications)
+    engine.stop()
+
+    stored = {notif["id"]: notif for notif in open_store(os.path.join(workdir, "stress.db")).load()}
+    duplicates = len(fired) - len(set(fired))
+    unknown = {notification_id for notification_id, _ in fired} - seen_ids
+    if duplicates:
+        errors.append(f"{duplicates} occurrences fired more than once")
+    if unknown:
+        errors.append(f"{len(unknown)} fired notifications never appeared in a snapshot")
+    if stored != final:
+        errors.append(f"store has {len(stored)} notifications, final snapshot {len(final)}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    virtual_days = (clock.now - datetime(2026, 1, 5).timestamp()) / 86400
+    print(f"{elapsed:.1f}s: {counts['creates']} creates, {counts['updates']} updates, "
+          f"{counts['deletes']} deletes, {counts['snapshots']} snapshots read, "
+          f"{len(fired)} fires over {virtual_days:.1f} virtual days, {len(final)} left")
+    for error in errors:
+        print(f"FAIL: {error}")
+    if errors:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
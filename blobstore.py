@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+
+# Magic numbers used to pick a file extension for images that arrive as raw bytes
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\x00\x00\x01\x00", ".ico"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF8", ".gif"),
+    (b"BM", ".bmp"),
+)
+
+
+# Blobs are named by the SHA-256 of their content, as lowercase hex
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value):
+    return isinstance(value, str) and DIGEST.match(value) is not None
+
+
+def guess_suffix(data):
+    for signature, suffix in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return suffix
+    return ".bin"
+
+
+class ImageBlobStore:
+    """Content-addressed image store: each distinct image is kept once on disk.
+
+    Blobs live at `<root>/<first two hex chars>/<sha256><suffix>` and are
+    referenced from notifications by their hash. Because the stored file is
+    already a usable image, resolving a hash just returns its path.
+    """
+
+    def __init__(self, root="images"):
+        self.root = root
+        self._lock = threading.Lock()
+        self._paths = {}  # hash -> materialized path
+
+    def put_bytes(self, data, suffix=None):
+        """Store `data` (if not already present) and return its hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._paths:
+                return digest
+        path = self._find(digest)
+        if path is None:
+            path = self._blob_path(digest, suffix or guess_suffix(data))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a sibling temp file first so readers never see half a blob
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        with self._lock:
+            self._paths[digest] = path
+        return digest
+
+    def put_file(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        suffix = os.path.splitext(path)[1].lower() or None
+        return self.put_bytes(data, suffix)
+
+    def path(self, digest):
+        """Path of the stored image for `digest`, or None if it is unknown"""
+        if not is_digest(digest):
+            return None
+        with self._lock:
+            path = self._paths.get(digest)
+        if path is not None and os.path.exists(path):
+            return path
+        path = self._find(digest)
+        if path is not None:
+            with self._lock:
+                self._paths[digest] = path
+        return path
+
+    def delete(self, digest):
+        """Remove the blob for `digest`; unknown or already removed blobs are ignored"""
+        path = self.path(digest)
+        with self._lock:
+            self._paths.pop(digest, None)
+        if path:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _blob_path(self, digest, suffix):
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def _find(self, digest):
+        directory = os.path.join(self.root, digest[:2])
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return None
+        for name in names:
+            # Only "<digest><suffix>"; a prefix of another hash must never match
+            stem, suffix = os.path.splitext(name)
+            if stem == digest and suffix != ".tmp":
+                return os.path.join(directory, name)
+        return None
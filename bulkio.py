@@ -0,0 +1,140 @@
+import argparse
+import csv
+import json
+import os
+
+from engine import validate_notification
+
+# Columns written on export; imports accept any subset that passes validation
+EXPORT_FIELDS = ("id", "title", "message", "time", "repeat", "tz", "sound", "image_hash")
+BATCH_SIZE = 500
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type: {path} (use .csv or .jsonl)")
+
+
+def read_csv(f):
+    """Yield (line number, row dict) from a CSV file with a header row"""
+    reader = csv.DictReader(f)
+    for row in reader:
+        yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, "")}
+
+
+def read_jsonl(f):
+    """Yield (line number, object) from a JSON Lines file, skipping blank lines"""
+    for line_num, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, ValueError(f"Invalid JSON: {str(e)}")
+            continue
+        yield line_num, row
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def import_rows(api, rows, batch_size=BATCH_SIZE, on_batch=None):
+    """Validate `(line number, row)` pairs and create them in batches.
+
+    Only one batch is held in memory at a time, and each batch is a single
+    `create_notifications` call (one persistence write). `on_batch(created)`
+    runs after every batch, e.g. to refresh a list once. Invalid rows are
+    skipped and reported. Returns (imported count, [(line number, error)]).
+    """
+    imported = 0
+    errors = []
+    batch = []
+    for line_num, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError("Expected an object")
+            batch.append(validate_notification(row))
+        except ValueError as e:
+            errors.append((line_num, str(e)))
+            continue
+        if len(batch) >= batch_size:
+            imported += _flush(api, batch, on_batch)
+            batch = []
+    if batch:
+        imported += _flush(api, batch, on_batch)
+    return imported, errors
+
+
+def _flush(api, batch, on_batch):
+    created = api.create_notifications(batch)
+    if on_batch:
+        on_batch(created)
+    return len(created)
+
+
+def import_file(api, path, batch_size=BATCH_SIZE, on_batch=None):
+    reader = READERS[detect_format(path)]
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return import_rows(api, reader(f), batch_size, on_batch)
+
+
+def export_file(notifications, path):
+    """Write notifications (any iterable of dicts) one row at a time"""
+    fmt = detect_format(path)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for notif in notifications:
+                writer.writerow(notif)
+                count += 1
+        else:
+            for notif in notifications:
+                f.write(json.dumps({k: notif[k] for k in EXPORT_FIELDS if notif.get(k) is not None}))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export notifications as CSV or JSON Lines")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("path", help="a .csv or .jsonl file")
+    parser.add_argument("--connect", metavar="ADDRESS", help="use a running notifier daemon")
+    parser.add_argument("--storage", help="notification store to use without a daemon")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.connect:
+        from daemon import NotifierClient
+        api = NotifierClient(args.connect)
+    else:
+        from engine import NotifierEngine, STORAGE_PATH
+        api = NotifierEngine(args.storage or STORAGE_PATH, backends=[])
+
+    try:
+        if args.action == "import":
+            imported, errors = import_file(api, args.path, args.batch_size)
+            for line_num, error in errors:
+                print(f"{args.path}:{line_num}: {error}")
+            print(f"Imported {imported} notifications, skipped {len(errors)}")
+        else:
+            exported = export_file(api.list_notifications(), args.path)
+            print(f"Exported {exported} notifications")
+    finally:
+        if args.connect:
+            api.close()
+        else:
+            api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import threading
+
+import metrics
+from dispatch import NotificationJob
+
+# Reminders firing within this many seconds of each other become one summary
+COALESCE_WINDOW = 1.0
+# Most reminders named in one summary; the rest are counted as "and N more"
+MAX_GROUP = 5
+
+
+def thread_timer(delay, callback):
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+class Coalescer:
+    """Groups jobs submitted within `window` seconds into summary notifications.
+
+    The first job of a burst starts the window; when it closes, a lone job is
+    passed on unchanged and anything more becomes a single summary job, so a
+    burst of reminders costs one backend call. A summary lists up to
+    `max_group` titles and carries the keys of every job it replaces in
+    `parts`, so each occurrence still counts as delivered. Engines each have
+    their own, so a summary never mixes reminders from different profiles.
+
+    `timer(delay, callback)` starts the window timer and returns an object
+    with cancel(); by default it is a threading.Timer.
+    """
+
+    def __init__(self, submit, window=COALESCE_WINDOW, max_group=MAX_GROUP, timer=None):
+        self.submit = submit
+        self.window = window
+        self.max_group = max_group
+        self.timer = timer or thread_timer
+        self._pending = []
+        self._keys = set()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        """Queue `job` for the current window; returns False for a duplicate key"""
+        with self._lock:
+            if job.key is not None:
+                if job.key in self._keys:
+                    return False
+                self._keys.add(job.key)
+            self._pending.append(job)
+            if self._timer is None:
+                self._timer = self.timer(self.window, self.flush)
+        return True
+
+    def flush(self):
+        """Close the current window and hand its jobs to `submit`"""
+        with self._lock:
+            jobs = self._pending
+            self._pending = []
+            self._keys = set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if len(jobs) == 1:
+            self.submit(jobs[0])
+        elif jobs:
+            metrics.COALESCED.inc(len(jobs))
+            self.submit(self.summarize(jobs))
+
+    def stop(self):
+        self.flush()
+
+    def summarize(self, jobs):
+        lines = [job.title for job in jobs[:self.max_group]]
+        if len(jobs) > self.max_group:
+            lines.append(f"...and {len(jobs) - self.max_group} more")
+        sound = next((job.sound_path for job in jobs if job.sound_path), None)
+        summary = NotificationJob(tuple(job.key for job in jobs), f"{len(jobs)} reminders",
+                                  "\n".join(lines), sound_path=sound)
+        summary.parts = [job.key for job in jobs]
+        summary.profile = jobs[0].profile
+        summary.icon_path = jobs[0].icon_path
+        summary.default_image = jobs[0].default_image
+        summary.silent = jobs[0].silent
+        return summary
@@ -0,0 +1,421 @@
+"""Headless notifier daemon with a local JSON API.
+
+Run `python daemon.py` to serve on http://127.0.0.1:8765, or pass
+`--socket PATH` to listen on a Unix socket instead. Endpoints:
+
+    GET    /notifications          list every notification
+    POST   /notifications          create one object or a list of objects
+    PATCH  /notifications          update a list of objects (each with "id")
+    PUT    /notifications/<id>     update one notification
+    DELETE /notifications/<id>     delete one notification
+    POST   /notifications/delete   delete {"ids": [...]}
+    GET    /images/<hash>          {"path": ...} of a stored image
+    GET    /health
+    GET    /metrics                Prometheus text format (with --metrics)
+    GET    /profiles               {"profiles": [...]}
+    GET    /profiles/<name>/settings
+    PUT    /profiles/<name>/settings
+
+Every /notifications and /images endpoint also exists under /profiles/<name>/
+for that profile; without the prefix they act on the default profile. A
+profile is created the first time it is used.
+
+Errors come back as {"error": message} with status 400 (validation) or 404.
+So that web pages can't reach the API, requests must name 127.0.0.1 or
+localhost in their Host header (403 otherwise, against DNS rebinding) and
+send bodies as application/json (415 otherwise).
+The Tk app talks to a running daemon with `--connect`, through NotifierClient.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from engine import NotifierAPI, NotifierRuntime, STORAGE_PATH, IMAGE_STORE_PATH, DISPATCH_WORKERS, DEFAULT_PROFILE
+from ledger import CatchUpPolicy, LEDGER_PATH
+from profiles import ProfileManager, PROFILES_DIR
+import metrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Host header values accepted (with any port); others are refused
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+class RequestRejected(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = "NotifierDaemon/1.0"
+    # Every response carries Content-Length, so clients can keep connections open
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._guard(self._get)
+
+    def _get(self):
+        parts = self._path_parts()
+        if parts == ["health"]:
+            self._send(200, {"status": "ok", "profiles": len(self.server.profiles.runtime.engines),
+                             "scheduled": len(self.server.profiles.runtime.scheduler)})
+            return
+        if parts == ["metrics"]:
+            metrics.send_prometheus(self)
+            return
+        if parts == ["profiles"]:
+            self._send(200, {"profiles": self.server.profiles.names()})
+            return
+        if len(parts) == 3 and parts[0] == "profiles" and parts[2] == "settings":
+            self._call(200, self.server.profiles.settings, parts[1])
+            return
+        engine, parts = self._route(parts)
+        if parts == ["notifications"]:
+            self._send(200, engine.list_notifications())
+        elif len(parts) == 2 and parts[0] == "notifications":
+            notif = engine.get_notification(parts[1])
+            if notif is None:
+                self._send(404, {"error": f"Unknown notification: {parts[1]}"})
+            else:
+                self._send(200, notif)
+        elif len(parts) == 2 and parts[0] == "images":
+            self._send(200, {"path": engine.image_path(parts[1])})
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        self._guard(self._post)
+
+    def _post(self):
+        engine, parts = self._route(self._path_parts())
+        if parts == ["notifications"]:
+            body = self._read_json()
+            items = self._objects(body if isinstance(body, list) else [body])
+            self._call(201, engine.create_notifications, items)
+        elif parts == ["notifications", "delete"]:
+            ids = self._object(self._read_json()).get("ids", [])
+            if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+                raise ValueError('"ids" must be a list of strings')
+            self._call(200, lambda ids: {"deleted": engine.delete_notifications(ids)}, ids)
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_PATCH(self):
+        self._guard(self._patch)
+
+    def _patch(self):
+        engine, parts = self._route(self._path_parts())
+        if parts == ["notifications"]:
+            body = self._read_json()
+            if not isinstance(body, list):
+                raise ValueError("expected a list of notifications")
+            self._call(200, engine.update_notifications, self._objects(body))
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_PUT(self):
+        self._guard(self._put)
+
+    def _put(self):
+        parts = self._path_parts()
+        if len(parts) == 3 and parts[0] == "profiles" and parts[2] == "settings":
+            self._call(200, lambda settings: self.server.profiles.update_settings(parts[1], settings),
+                       self._object(self._read_json()))
+            return
+        engine, parts = self._route(parts)
+        if len(parts) == 2 and parts[0] == "notifications":
+            data = dict(self._object(self._read_json()), id=parts[1])
+            self._call(200, lambda items: engine.update_notifications(items)[0], [data])
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_DELETE(self):
+        self._guard(self._delete)
+
+    def _delete(self):
+        engine, parts = self._route(self._path_parts())
+        if len(parts) == 2 and parts[0] == "notifications":
+            deleted = engine.delete_notifications([parts[1]])
+            if deleted:
+                self._send(200, {"deleted": deleted})
+            else:
+                self._send(404, {"error": f"Unknown notification: {parts[1]}"})
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _path_parts(self):
+        return [part for part in urlsplit(self.path).path.split("/") if part]
+
+    def _route(self, parts):
+        """Split a /profiles/<name>/ prefix off `parts`; returns (engine, rest)"""
+        if len(parts) >= 2 and parts[0] == "profiles":
+            return self.server.profiles.get(parts[1]), parts[2:]
+        return self.server.profiles.get(DEFAULT_PROFILE), parts
+
+    def _read_json(self):
+        # Browsers may send text/plain or form bodies cross-site without asking first
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            raise RequestRejected(415, "Content-Type must be application/json")
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else {}
+
+    def _object(self, body):
+        if not isinstance(body, dict):
+            raise ValueError("expected a JSON object")
+        return body
+
+    def _objects(self, items):
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError("expected JSON objects")
+        return items
+
+    def _check_host(self):
+        host = (self.headers.get("Host") or "").lower()
+        port = ""
+        if ":" in host and not host.endswith("]"):
+            host, port = host.rsplit(":", 1)
+        if host not in LOCAL_HOSTS or (port and not port.isdigit()):
+            raise RequestRejected(403, "Requests must be addressed to 127.0.0.1 or localhost")
+
+    def _guard(self, handler):
+        # Malformed JSON bodies are client errors, not server crashes
+        try:
+            self._check_host()
+            handler()
+        except RequestRejected as e:
+            # The body may not have been read, so the connection can't be reused
+            self.close_connection = True
+            self._send(e.status, {"error": str(e)})
+        except ValueError as e:
+            self._send(400, {"error": f"Invalid request: {str(e)}"})
+        except Exception as e:
+            # Still answer, so the client doesn't see a dropped connection
+            print(f"Request {self.command} {self.path} failed: {e!r}")
+            self._send(500, {"error": "Internal error"})
+
+    def _call(self, status, func, arg):
+        try:
+            self._send(status, func(arg))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+        except KeyError as e:
+            self._send(404, {"error": e.args[0] if e.args else "Not found"})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, profiles, address, verbose=False):
+        self.profiles = profiles
+        self.verbose = verbose
+        super().__init__(address, APIRequestHandler)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, profiles, path, verbose=False):
+        self.profiles = profiles
+        self.verbose = verbose
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, APIRequestHandler)
+        os.chmod(path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def make_server(profiles, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    """`profiles` is a ProfileManager; every profile is served by the one server"""
+    if socket_path:
+        return UnixHTTPServer(profiles, socket_path, verbose)
+    return LocalHTTPServer(profiles, (host, port), verbose)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=10):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class NotifierClient(NotifierAPI):
+    """Talks to a running daemon; same methods as NotifierEngine.
+
+    `address` is either http://host:port or a Unix socket path; `profile`
+    picks a profile other than the default one.
+    """
+
+    def __init__(self, address, timeout=10, profile=None):
+        self.address = address
+        self.timeout = timeout
+        self.profile = profile or DEFAULT_PROFILE
+        self.prefix = f"/profiles/{profile}" if profile else ""
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def list_notifications(self):
+        return self._request("GET", self.prefix + "/notifications")
+
+    def get_notification(self, notification_id):
+        try:
+            return self._request("GET", f"{self.prefix}/notifications/{notification_id}")
+        except KeyError:
+            return None
+
+    def create_notifications(self, items):
+        return self._request("POST", self.prefix + "/notifications", list(items))
+
+    def update_notifications(self, items):
+        return self._request("PATCH", self.prefix + "/notifications", list(items))
+
+    def delete_notifications(self, ids):
+        return self._request("POST", self.prefix + "/notifications/delete", {"ids": list(ids)})["deleted"]
+
+    def image_path(self, image_hash):
+        if not image_hash:
+            return None
+        return self._request("GET", f"{self.prefix}/images/{image_hash}")["path"]
+
+    def settings(self):
+        return self._request("GET", f"/profiles/{self.profile}/settings")
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self):
+        if self.address.startswith(("http://", "https://")):
+            parts = urlsplit(self.address)
+            return http.client.HTTPConnection(parts.hostname, parts.port or DEFAULT_PORT, timeout=self.timeout)
+        return UnixHTTPConnection(self.address, timeout=self.timeout)
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        with self._lock:
+            for attempt in range(2):
+                if self._conn is None:
+                    self._conn = self._connect()
+                try:
+                    self._conn.request(method, path, body=body, headers=headers)
+                    response = self._conn.getresponse()
+                    data = json.loads(response.read() or b"null")
+                    break
+                except (http.client.HTTPException, ConnectionError):
+                    # Keep-alive connection went away; reconnect once
+                    self._conn.close()
+                    self._conn = None
+                    if attempt:
+                        raise
+        if response.status == 400:
+            raise ValueError(data["error"])
+        if response.status == 404:
+            raise KeyError(data["error"])
+        if response.status >= 300:
+            raise RuntimeError(data.get("error") if isinstance(data, dict) else response.reason)
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the notifier without a GUI")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--profiles", default=PROFILES_DIR, help="directory holding one folder per profile")
+    parser.add_argument("--storage", default=STORAGE_PATH, help="store of the default profile")
+    parser.add_argument("--images", default=IMAGE_STORE_PATH, help="images of the default profile")
+    parser.add_argument("--workers", type=int, default=DISPATCH_WORKERS)
+    parser.add_argument("--ledger", default=LEDGER_PATH, help="fire ledger of the default profile")
+    parser.add_argument("--catch-up", default="coalesce", choices=CatchUpPolicy.MODES,
+                        help="what to do with reminders missed while the daemon was down")
+    parser.add_argument("--metrics", action="store_true", help="collect metrics, served at GET /metrics")
+    parser.add_argument("--metrics-dump", metavar="PATH", help="also write metrics as JSON to this file")
+    parser.add_argument("--metrics-interval", type=float, default=60, help="seconds between JSON dumps")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="schedule and deliver on one asyncio event loop instead of threads")
+    parser.add_argument("--sound", action="store_true",
+                        help="play notification sounds on this machine (winsound, paplay or aplay)")
+    parser.add_argument("--verbose", action="store_true", help="log every API request")
+    args = parser.parse_args()
+
+    dumper = None
+    if args.metrics or args.metrics_dump:
+        metrics.REGISTRY.enable()
+    if args.metrics_dump:
+        dumper = metrics.JsonDumper(args.metrics_dump, args.metrics_interval)
+        dumper.start()
+
+    if args.asyncio:
+        from aio_engine import AsyncRuntime
+        runtime = AsyncRuntime(workers=args.workers)
+    else:
+        runtime = NotifierRuntime(workers=args.workers)
+    audio = None
+    if args.sound:
+        from audio import AudioPlayer
+        audio = AudioPlayer()
+    profiles = ProfileManager(args.profiles, runtime,
+                              default_paths={"storage": args.storage, "images": args.images,
+                                             "ledger": args.ledger},
+                              catch_up=CatchUpPolicy(args.catch_up), audio=audio)
+    server = make_server(profiles, args.host, args.port, args.socket, args.verbose)
+    profiles.start()
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Notifier daemon listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        profiles.stop()
+        if audio:
+            audio.stop()
+        if dumper:
+            dumper.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class DispatchTimeout(Exception):
+    pass
+
+
+class Backend:
+    """A delivery function plus the time it is allowed to take.
+
+    `send(job)` must raise on failure; returning normally counts as delivered.
+    It may be an `async def`, or return an awaitable: the asyncio runtime
+    (aio_engine.py) awaits it on the event loop, worker threads run it with
+    asyncio.run(). With `rate` set, calls are limited to `rate` per second
+    with bursts of up to `burst`; workers wait for their turn rather than
+    skip the backend.
+    """
+
+    def __init__(self, name, send, timeout=10.0, rate=None, burst=1):
+        self.name = name
+        self.send = send
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate, burst) if rate else None
+        self.is_async = is_coroutine_function(send)
+
+    def call(self, job):
+        """Send `job` on the calling thread"""
+        result = self.send(job)
+        if is_awaitable(result):
+            import asyncio  # only async backends need it; it is slow to import
+            return asyncio.run(wait(result))
+        return result
+
+    def unavailable(self):
+        """True once a lazily loaded backend failed to load. Calling it fails
+        at once, so it isn't charged against the rate limit."""
+        return getattr(self.send, "failed", False)
+
+
+def is_coroutine_function(func):
+    """Whether calling `func` returns a coroutine, including partials and
+    objects with an `async def __call__`"""
+    import inspect  # not at module level: it slows down importing the engine
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None))
+
+
+def is_awaitable(value):
+    # What inspect.isawaitable() checks for coroutines, futures and tasks
+    return hasattr(value, "__await__")
+
+
+async def wait(awaitable):
+    """A coroutine for any awaitable, as asyncio.run() only accepts coroutines"""
+    return await awaitable
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the time waited"""
+        waited = 0.0
+        delay = self.try_acquire()
+        while delay:
+            time.sleep(delay)
+            waited += delay
+            delay = self.try_acquire()
+        return waited
+
+    def try_acquire(self):
+        """Take a token if one is available (returns 0), else return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class NotificationJob:
+    __slots__ = ("key", "title", "message", "image_path", "sound_path", "queued_at", "parts",
+                 "profile", "icon_path", "default_image",
+                 "silent")
+
+    def __init__(self, key, title, message, image_path=None, sound_path=None):
+        self.key = key
+        self.title = title
+        self.message = message
+        self.image_path = image_path
+        self.sound_path = sound_path
+        self.queued_at = None
+        self.parts = None  # keys of the jobs a summary job stands for
+        self.profile = None
+        self.icon_path = None  # the profile's app icon, if it has one
+        self.default_image = None  # the profile's image for jobs without one
+        self.silent = False  # the sound is played by an audio player, not the backend
+
+
+class DispatchQueue:
+    """Bounded queue of notifications delivered by a pool of worker threads.
+
+    Each job tries the backends in order (falling back on error or timeout)
+    and the whole chain is retried with exponential backoff. Jobs are keyed,
+    typically by (notification id, occurrence); a key that is queued, in
+    flight or recently delivered is not accepted twice.
+
+    `on_delivered(job, backend_name)` and `on_failure(job, error)` are called
+    from the worker thread once a job succeeds or runs out of retries.
+    """
+
+    def __init__(self, backends, workers=4, maxsize=1000, retries=2, backoff=1.0,
+                 on_failure=None, remember=10000, on_delivered=None):
+        self.backends = list(backends)
+        self.retries = retries
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self.on_delivered = on_delivered
+        self.remember = remember
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._seen = OrderedDict()  # recent job keys, oldest first
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        self._stopped = False
+
+    def start(self):
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self, timeout=None):
+        """Let queued jobs finish, then stop the workers"""
+        self._stopped = True
+        live = [worker for worker in self._workers if worker.is_alive()]
+        for _ in live:
+            self._queue.put(None)
+        for worker in live:
+            worker.join(timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def submit(self, job):
+        """Queue `job`; returns False if it is a duplicate or the queue is full"""
+        if self._stopped:
+            return False
+        with self._lock:
+            if job.key is not None:
+                if job.key in self._seen:
+                    metrics.JOBS.inc(outcome="duplicate")
+                    return False
+                self._seen[job.key] = True
+                while len(self._seen) > self.remember:
+                    self._seen.popitem(last=False)
+        job.queued_at = time.perf_counter()
+        if not self._enqueue(job):
+            with self._lock:
+                self._seen.pop(job.key, None)
+            metrics.JOBS.inc(outcome="dropped")
+            print(f"Notification queue full, dropping: {job.title}")
+            return False
+        return True
+
+    def _enqueue(self, job):
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            return False
+        return True
+
+    def deliver(self, job):
+        """Deliver `job` on the calling thread, returning the backend name used"""
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            for index, backend in enumerate(self.backends):
+                if backend.limiter and not backend.unavailable():
+                    metrics.RATE_LIMIT_WAIT.observe(backend.limiter.acquire(), backend=backend.name)
+                start = time.perf_counter()
+                try:
+                    call_with_timeout(backend.call, job, backend.timeout)
+                except Exception as e:
+                    self._record_attempt(backend, index, start, e)
+                    last_error = e
+                    continue
+                self._record_attempt(backend, index, start)
+                return backend.name
+        raise last_error or RuntimeError("No notification system available")
+
+    def _record_attempt(self, backend, index, start, error=None):
+        metrics.BACKEND_LATENCY.observe(time.perf_counter() - start, backend=backend.name)
+        if error is not None:
+            timed_out = isinstance(error, DispatchTimeout)
+            metrics.BACKEND_RESULTS.inc(backend=backend.name, result="timeout" if timed_out else "error")
+            print(f"{backend.name} error: {str(error) or type(error).__name__}")
+            return
+        metrics.BACKEND_RESULTS.inc(backend=backend.name, result="success")
+        if index:
+            metrics.FALLBACKS.inc(backend=backend.name)
+
+    def _finish(self, job, backend_name, error=None):
+        """Count the outcome of `job` and report it to the callbacks"""
+        if error is not None:
+            metrics.JOBS.inc(outcome="failed")
+            if self.on_failure:
+                self.on_failure(job, error)
+            return
+        metrics.JOBS.inc(outcome="delivered")
+        if self.on_delivered:
+            try:
+                self.on_delivered(job, backend_name)
+            except Exception as e:
+                print(f"Failed to record delivery: {str(e)}")
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if job.queued_at is not None:
+                    metrics.QUEUE_WAIT.observe(time.perf_counter() - job.queued_at)
+                try:
+                    backend_name = self.deliver(job)
+                except Exception as e:
+                    self._finish(job, None, e)
+                    continue
+                self._finish(job, backend_name)
+            finally:
+                self._queue.task_done()
+
+
+def call_with_timeout(func, arg, timeout):
+    """Run `func(arg)` on a helper thread and give up after `timeout` seconds.
+
+    Python threads can't be killed, so a stuck call is abandoned (it keeps
+    running as a daemon thread) rather than cancelled.
+    """
+    if timeout is None:
+        return func(arg)
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func(arg)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise DispatchTimeout(f"timed out after {timeout}s")
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
@@ -0,0 +1,491 @@
+import base64
+import threading
+import time
+from collections import Counter
+from collections.abc import Mapping
+from datetime import datetime
+
+from scheduler import NotificationScheduler
+from recurrence import rule_for, parse_rule
+from storage import open_store, migrate_json_to_sqlite, new_id, WriteBehindStore, WRITE_DELAY
+from blobstore import ImageBlobStore, is_digest
+from dispatch import DispatchQueue, NotificationJob
+from coalesce import Coalescer, COALESCE_WINDOW, MAX_GROUP, thread_timer
+from backends import default_backends
+from ledger import FireLedger, CatchUpPolicy, LEDGER_PATH
+from repository import NotificationRepository
+import metrics
+
+# Notifications are kept in SQLite; a legacy notifications.json is migrated on first start
+STORAGE_PATH = "notifications.db"
+LEGACY_JSON_PATH = "notifications.json"
+# Notification images are stored once per distinct image, keyed by hash
+IMAGE_STORE_PATH = "images"
+# Number of threads delivering notifications concurrently
+DISPATCH_WORKERS = 4
+# An occurrence fired this many seconds late (sleep, suspended VM) counts as missed
+LATE_AFTER = 120
+# How often the engine notes in the fire ledger that it is still running
+CHECKPOINT_INTERVAL = 60
+
+# Profile used when none is given; it keeps the files above in the working directory
+DEFAULT_PROFILE = "default"
+
+# Fields a client may set on a notification
+EDITABLE_FIELDS = ("title", "message", "time", "repeat", "tz", "sound", "image_hash")
+# Optional fields that, when given, must be strings
+STRING_FIELDS = ("tz", "sound", "image_hash", "image_path")
+
+
+def validate_notification(data):
+    """Check a notification the same way the Create form does.
+
+    Returns a cleaned copy with only editable fields; raises ValueError with
+    a user-facing message otherwise.
+    """
+    if not isinstance(data, Mapping):
+        raise ValueError("A notification must be an object")
+    for field in STRING_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            raise ValueError(f"Invalid {field}: must be a string")
+    if data.get("image_hash") is not None and not is_digest(data["image_hash"]):
+        raise ValueError("Invalid image_hash: must be a lowercase SHA-256 hex digest")
+    title = str(data.get("title") or "").strip()
+    message = str(data.get("message") or "").strip()
+    time_str = str(data.get("time") or "").strip()
+    repeat = str(data.get("repeat") or "daily").strip()
+
+    if not all([title, message, time_str]):
+        raise ValueError("All fields are required!")
+
+    try:
+        datetime.strptime(time_str, "%H:%M")
+    except ValueError:
+        raise ValueError("Invalid time format! Use HH:MM")
+
+    try:
+        parse_rule(repeat, time_str, data.get("tz"))
+    except ValueError as e:
+        raise ValueError(f"Invalid repeat rule: {str(e)}")
+
+    cleaned = {k: data[k] for k in EDITABLE_FIELDS if data.get(k) is not None}
+    cleaned.update(title=title, message=message, time=time_str, repeat=repeat)
+    return cleaned
+
+
+class NotifierAPI:
+    """Operations shared by the in-process engine and the daemon client.
+
+    Subclasses implement the bulk methods; the single-item helpers wrap them.
+    """
+
+    def list_notifications(self):
+        raise NotImplementedError
+
+    def create_notifications(self, items):
+        raise NotImplementedError
+
+    def update_notifications(self, items):
+        raise NotImplementedError
+
+    def delete_notifications(self, ids):
+        raise NotImplementedError
+
+    def image_path(self, image_hash):
+        raise NotImplementedError
+
+    def create_notification(self, data):
+        return self.create_notifications([data])[0]
+
+    def update_notification(self, notification_id, data):
+        return self.update_notifications([dict(data, id=notification_id)])[0]
+
+    def delete_notification(self, notification_id):
+        return self.delete_notifications([notification_id])
+
+
+class NotifierRuntime:
+    """Scheduler thread and dispatch workers shared by any number of engines.
+
+    Each engine is one profile. Scheduler keys are (profile, notification id)
+    and jobs carry their profile, so fires and delivery results go back to the
+    engine that owns them; hundreds of profiles still cost one scheduler
+    thread and one worker pool.
+    """
+
+    def __init__(self, backends=None, workers=DISPATCH_WORKERS, clock=None,
+                 default_icon=None, default_image=None):
+        self.clock = clock or time.time
+        self.engines = {}  # profile -> NotifierEngine
+        self._started = False
+        if backends is None:
+            backends = default_backends(default_icon, default_image)
+        self.dispatcher = self._create_dispatcher(backends, workers)
+        self.scheduler = self._create_scheduler()
+        metrics.SCHEDULED.set_function(lambda: len(self.scheduler))
+        metrics.QUEUE_DEPTH.set_function(self.dispatcher.qsize)
+
+    def _create_dispatcher(self, backends, workers):
+        return DispatchQueue(backends, workers=workers, on_failure=self._failed,
+                             on_delivered=self._delivered)
+
+    def _create_scheduler(self):
+        return NotificationScheduler(self._fire, clock=self.clock, on_wake=self._wake)
+
+    def call_later(self, delay, callback):
+        """Run `callback` after `delay` seconds; returns an object with cancel()"""
+        return thread_timer(delay, callback)
+
+    def attach(self, engine):
+        if engine.profile in self.engines:
+            raise ValueError(f"Profile already open: {engine.profile}")
+        self.engines[engine.profile] = engine
+
+    def detach(self, engine):
+        if self.engines.get(engine.profile) is engine:
+            del self.engines[engine.profile]
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self.dispatcher.start()
+        self.scheduler.start()
+
+    def stop(self):
+        """Stop firing, hand pending summaries to the workers and let them finish"""
+        self.scheduler.stop()
+        for engine in list(self.engines.values()):
+            engine.flush()
+        self.dispatcher.stop(timeout=5)
+
+    def _fire(self, key, occurrence):
+        profile, notification_id = key
+        engine = self.engines.get(profile)
+        if engine is not None:
+            engine.fire_notification(notification_id, occurrence)
+
+    def _wake(self, now):
+        for engine in list(self.engines.values()):
+            engine._on_wake(now)
+
+    def _delivered(self, job, backend_name):
+        engine = self.engines.get(job.profile)
+        if engine is not None:
+            engine._delivered(job, backend_name)
+
+    def _failed(self, job, error):
+        engine = self.engines.get(job.profile)
+        if engine is not None:
+            engine._dispatch_failed(job, error)
+        else:
+            print(f"Failed to send notification: {str(error)}")
+
+
+class NotifierEngine(NotifierAPI):
+    """Storage, scheduling and delivery for one profile, without any GUI.
+
+    Runs inside the Tk app or on its own as a daemon (see daemon.py). Pass a
+    shared `runtime` to serve several profiles from one process (see
+    profiles.py); otherwise the engine starts and stops a runtime of its own.
+    Notifications may carry an "image_path" on create/update; the file is
+    copied into the image store and replaced by its "image_hash".
+
+    Delivered occurrences are written to a fire ledger so nothing fires twice
+    across restarts, and occurrences missed while the engine was stopped or
+    the machine was asleep are handled by the `catch_up` policy. Reminders
+    firing within `coalesce_window` seconds of each other are delivered as
+    one summary (0 turns this off). Edits are journaled and written to the
+    store in the background after `write_delay` seconds (0 writes them
+    synchronously); stop() saves whatever is still pending. With an `audio`
+    player (audio.AudioPlayer) each delivered notification plays its sound
+    (backends then keep their own sound off), and every sound in use is
+    loaded into memory up front.
+    """
+
+    def __init__(self, storage_path=STORAGE_PATH, image_store_path=IMAGE_STORE_PATH,
+                 backends=None, workers=DISPATCH_WORKERS, default_icon=None,
+                 default_image=None, default_sound=None, on_failure=None, clock=None,
+                 ledger_path=LEDGER_PATH, catch_up=None, coalesce_window=COALESCE_WINDOW,
+                 max_group=MAX_GROUP, runtime=None, profile=DEFAULT_PROFILE,
+                 legacy_json_path=LEGACY_JSON_PATH, write_delay=WRITE_DELAY, audio=None):
+        self.profile = profile
+        self.default_icon = default_icon
+        self.default_image = default_image
+        self.default_sound = default_sound
+        self.audio = audio
+        self.on_failure = on_failure
+        self.catch_up = catch_up or CatchUpPolicy()
+        self._lock = threading.RLock()
+        self._started = False
+
+        self._owns_runtime = runtime is None
+        if runtime is None:
+            runtime = NotifierRuntime(backends, workers, clock, default_icon, default_image)
+        self.runtime = runtime
+        self.clock = runtime.clock
+        self.scheduler = runtime.scheduler
+        self.dispatcher = runtime.dispatcher
+
+        self.store = open_store(storage_path)
+        if legacy_json_path:
+            try:
+                migrate_json_to_sqlite(legacy_json_path, self.store)
+            except Exception as e:
+                print(f"Failed to migrate {legacy_json_path}: {str(e)}")
+        if write_delay:
+            self.store = WriteBehindStore(self.store, write_delay)
+        self.blobs = ImageBlobStore(image_store_path)
+        with metrics.STORE_LATENCY.time(operation="load"):
+            loaded = self.store.load()
+        self.migrate_inline_images(loaded)
+        # Notifications per stored image; a blob is deleted with its last reference
+        self._image_refs = Counter(notif["image_hash"] for notif in loaded if notif.get("image_hash"))
+        self.repository = NotificationRepository(loaded)
+        self.ledger = FireLedger(ledger_path)
+
+        self.coalescer = None
+        if coalesce_window:
+            self.coalescer = Coalescer(self.dispatcher.submit, coalesce_window, max_group,
+                                       timer=runtime.call_later)
+        runtime.attach(self)
+        for notif in self.notifications.values():
+            self.schedule_notification(notif)
+        if audio:
+            audio.preload([default_sound] + [notif.get("sound") for notif in self.notifications.values()])
+
+    @property
+    def notifications(self):
+        """Current snapshot of the notifications, keyed by id in creation order.
+
+        Edits publish a new snapshot instead of changing this one, so it can
+        be read from any thread without holding the engine lock.
+        """
+        return self.repository.snapshot()
+
+    def start(self):
+        now = self.clock()
+        self.catch_up_missed(now)
+        self.ledger.checkpoint(now)
+        self._started = True
+        if self._owns_runtime:
+            self.runtime.start()
+
+    def stop(self):
+        if self._owns_runtime:
+            self.runtime.stop()
+        else:
+            for notification_id in self.notifications:
+                self.scheduler.unschedule((self.profile, notification_id))
+            self.flush()
+        self.runtime.detach(self)
+        if self._started:
+            # Only a running engine counts as alive; bulk imports and the like don't
+            self.ledger.checkpoint(self.clock())
+        self.ledger.close()
+        self.store.close()
+
+    def flush(self):
+        """Send any reminders still waiting in the coalescing window"""
+        if self.coalescer:
+            self.coalescer.flush()
+
+    def list_notifications(self):
+        return [dict(notif) for notif in self.notifications.values()]
+
+    def get_notification(self, notification_id):
+        notif = self.notifications.get(notification_id)
+        return dict(notif) if notif else None
+
+    # Writers hold the engine lock so the store, the published snapshot and
+    # the scheduler change together; readers only take a snapshot.
+
+    def create_notifications(self, items):
+        with self._lock:
+            # Images are stored under the lock so a concurrent delete can't
+            # remove a blob these notifications are about to reference
+            created = [self._prepare(data, new_id()) for data in items]
+            with metrics.STORE_LATENCY.time(operation="add"):
+                self.store.add_many(created)
+            self.repository.apply(upserts=created)
+            self._retain_images(created)
+            for notif in created:
+                self.schedule_notification(notif)
+        return [dict(notif) for notif in created]
+
+    def update_notifications(self, items):
+        with self._lock:
+            current = self.notifications
+            if not all(isinstance(data, Mapping) and isinstance(data.get("id"), str) for data in items):
+                raise ValueError("Each update must be an object with an \"id\"")
+            missing = [data["id"] for data in items if data["id"] not in current]
+            if missing:
+                raise KeyError(f"Unknown notification: {missing[0]}")
+            updated = []
+            for data in items:
+                updated.append(self._prepare(dict(current[data["id"]], **data), data["id"]))
+            with metrics.STORE_LATENCY.time(operation="update"):
+                self.store.add_many(updated)
+            self.repository.apply(upserts=updated)
+            self._retain_images(updated)
+            self._release_images([current[notif["id"]] for notif in updated])
+            for notif in updated:
+                self.schedule_notification(notif)
+        return [dict(notif) for notif in updated]
+
+    def delete_notifications(self, ids):
+        with self._lock:
+            current = self.notifications
+            deleted = [notification_id for notification_id in dict.fromkeys(ids) if notification_id in current]
+            with metrics.STORE_LATENCY.time(operation="delete"):
+                self.store.apply(deletes=deleted)
+            self.repository.apply(deletes=deleted)
+            self._release_images([current[notification_id] for notification_id in deleted])
+            for notification_id in deleted:
+                self.scheduler.unschedule((self.profile, notification_id))
+                self.ledger.forget(notification_id)
+        return len(deleted)
+
+    def image_path(self, image_hash):
+        return self.blobs.path(image_hash)
+
+    def _retain_images(self, notifications):
+        self._image_refs.update(notif["image_hash"] for notif in notifications if notif.get("image_hash"))
+
+    def _release_images(self, notifications):
+        """Drop one reference per notification; delete images nothing refers to anymore"""
+        for notif in notifications:
+            image_hash = notif.get("image_hash")
+            if not image_hash:
+                continue
+            self._image_refs[image_hash] -= 1
+            if self._image_refs[image_hash] <= 0:
+                del self._image_refs[image_hash]
+                try:
+                    self.blobs.delete(image_hash)
+                except OSError as e:
+                    print(f"Failed to delete image {image_hash}: {str(e)}")
+
+    def schedule_notification(self, notif):
+        """(Re)schedule a notification for its next occurrence"""
+        try:
+            rule = rule_for(notif)
+        except ValueError as e:
+            print(f"Not scheduling {notif['title']}: {str(e)}")
+            return
+        self.scheduler.schedule((self.profile, notif["id"]), rule.next_after)
+
+    def fire_notification(self, notification_id, occurrence):
+        """Called from the scheduler thread once per due occurrence"""
+        notif = self.notifications.get(notification_id)
+        if notif is None:
+            return
+        last = self.ledger.last(notification_id)
+        if last is not None and occurrence <= last:
+            metrics.FIRED.inc(outcome="duplicate")
+            return  # Already delivered, e.g. before a restart or clock change
+
+        now = self.clock()
+        metrics.FIRE_LAG.observe(max(0.0, now - occurrence))
+        if now - occurrence > LATE_AFTER:
+            # Woke up from sleep: this and any later occurrences up to now were missed
+            self._catch_up(notif, occurrence - 1, now)
+            return
+        metrics.FIRED.inc(outcome="on_time")
+        self._submit(notif, occurrence)
+
+    def catch_up_missed(self, now):
+        """Apply the catch-up policy to occurrences missed since the engine last ran.
+
+        Without a ledger entry or a checkpoint there is no record of the
+        engine running before, so nothing counts as missed. Occurrences from
+        before a notification was created or last edited never count either.
+        """
+        for notif in self.notifications.values():
+            since = self.ledger.last(notif["id"])
+            if since is None:
+                since = self.ledger.last_alive
+            if since is None:
+                continue
+            updated_at = notif.get("updated_at")
+            if isinstance(updated_at, (int, float)):
+                since = max(since, updated_at)
+            self._catch_up(notif, since, now)
+
+    def _catch_up(self, notif, since, now):
+        try:
+            rule = rule_for(notif)
+        except ValueError:
+            return
+        occurrences, missed, latest = self.catch_up.plan(rule, since, now)
+        title = notif["title"]
+        if missed > 1 and len(occurrences) == 1:
+            title = f"{title} (missed {missed} times)"
+        for occurrence in occurrences:
+            self._submit(notif, occurrence, title)
+        metrics.FIRED.inc(len(occurrences), outcome="caught_up")
+        metrics.FIRED.inc(missed - len(occurrences), outcome="skipped")
+        if latest is not None:
+            # Dropped occurrences count as handled so they aren't planned again
+            self.ledger.record(notif["id"], latest)
+
+    def _submit(self, notif, occurrence, title=None):
+        # Stored images are already files on disk, so firing never writes one
+        with metrics.IMAGE_LATENCY.time(operation="lookup"):
+            image_path = self.blobs.path(notif.get("image_hash"))
+
+        job = NotificationJob(
+            (notif["id"], occurrence),
+            title or notif["title"],
+            notif["message"],
+            image_path,
+            notif.get("sound", self.default_sound)
+        )
+        job.profile = self.profile
+        job.icon_path = self.default_icon
+        job.default_image = self.default_image
+        job.silent = self.audio is not None
+        if self.coalescer:
+            self.coalescer.add(job)
+        else:
+            self.dispatcher.submit(job)
+
+    def migrate_inline_images(self, notifications):
+        """Move base64 images embedded by older versions into the blob store"""
+        for notif in notifications:
+            image_data = notif.pop("image", None)
+            if image_data is None:
+                continue
+            try:
+                notif["image_hash"] = self.blobs.put_bytes(base64.b64decode(image_data))
+            except Exception as e:
+                print(f"Failed to migrate notification image: {str(e)}")
+            self.store.update(notif)
+
+    def _prepare(self, data, notification_id):
+        notif = validate_notification(data)
+        image_path = data.get("image_path")
+        if image_path:
+            with metrics.IMAGE_LATENCY.time(operation="store"):
+                notif["image_hash"] = self.blobs.put_file(image_path)
+        notif["id"] = notification_id
+        # When the current schedule took effect; catch-up doesn't look further back
+        notif["updated_at"] = self.clock()
+        return notif
+
+    def _delivered(self, job, backend_name):
+        for key in job.parts or (job.key,):
+            if isinstance(key, tuple):
+                self.ledger.record(*key)
+        if self.audio:
+            self.audio.play(job.sound_path)
+
+    def _on_wake(self, now):
+        if self.ledger.last_alive is None or now - self.ledger.last_alive >= CHECKPOINT_INTERVAL:
+            self.ledger.checkpoint(now)
+
+    def _dispatch_failed(self, job, error):
+        if self.on_failure:
+            self.on_failure(job, error)
+        else:
+            print(f"Failed to send notification: {str(error)}")
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+
+LEDGER_PATH = "fire_ledger.jsonl"
+
+
+class FireLedger:
+    """Append-only log of the last delivered occurrence per notification.
+
+    Each delivery appends one line `{"id": ..., "at": occurrence}`; the
+    engine also appends `{"alive": ts}` checkpoints while it runs, which is
+    how long it was down is known after a restart. The latest value per key
+    is kept in memory, and the file is rewritten with just those values once
+    it holds many superseded lines.
+    """
+
+    # Compact once the log has this many lines more than live entries
+    COMPACT_SLACK = 1000
+
+    def __init__(self, path=LEDGER_PATH, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._last = {}  # notification id -> last delivered occurrence
+        self.last_alive = None
+        self._lines = 0
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def last(self, notification_id):
+        with self._lock:
+            return self._last.get(notification_id)
+
+    def record(self, notification_id, occurrence):
+        """Remember that `occurrence` was delivered (older values are ignored)"""
+        with self._lock:
+            previous = self._last.get(notification_id)
+            if previous is not None and previous >= occurrence:
+                return
+            self._last[notification_id] = occurrence
+            self._append({"id": notification_id, "at": occurrence})
+
+    def checkpoint(self, now):
+        with self._lock:
+            self.last_alive = now
+            self._append({"alive": now})
+
+    def forget(self, notification_id):
+        with self._lock:
+            if self._last.pop(notification_id, None) is not None:
+                self._append({"forget": notification_id})
+
+    def compact(self):
+        """Rewrite the log with one line per notification plus the last checkpoint"""
+        with self._lock:
+            self._compact()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _append(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._lines += 1
+        if self._lines > len(self._last) + 1 + self.COMPACT_SLACK:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for notification_id, occurrence in self._last.items():
+                f.write(json.dumps({"id": notification_id, "at": occurrence}) + "\n")
+            if self.last_alive is not None:
+                f.write(json.dumps({"alive": self.last_alive}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lines = len(self._last) + (self.last_alive is not None)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-append can leave a partial last line
+                    continue
+                self._lines += 1
+                if "alive" in record:
+                    self.last_alive = max(self.last_alive or 0, record["alive"])
+                elif "forget" in record:
+                    self._last.pop(record["forget"], None)
+                elif record.get("id") is not None:
+                    previous = self._last.get(record["id"])
+                    if previous is None or record["at"] > previous:
+                        self._last[record["id"]] = record["at"]
+
+
+class CatchUpPolicy:
+    """What to do with occurrences missed while the engine was down or asleep.
+
+    mode "all" delivers every missed occurrence, "coalesce" delivers one
+    notification for the latest of them, and "drop" skips them. In every
+    mode, occurrences older than `max_age` seconds are ignored and at most
+    `limit` occurrences are delivered per notification.
+    """
+
+    MODES = ("all", "coalesce", "drop")
+
+    def __init__(self, mode="coalesce", max_age=24 * 3600, limit=100):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown catch-up mode: {mode} (use {', '.join(self.MODES)})")
+        self.mode = mode
+        self.max_age = max_age
+        self.limit = limit
+
+    def plan(self, rule, since, now):
+        """Return (occurrences to deliver, number missed, latest missed or None).
+
+        Only the window (since, now] is scanned, and never further back than
+        `max_age`, so a long outage costs at most `max_age` worth of steps.
+        """
+        if self.max_age is not None:
+            since = max(since, now - self.max_age)
+        missed = 0
+        latest = None
+        recent = []
+        for occurrence in rule.occurrences_between(since, now):
+            missed += 1
+            latest = occurrence
+            recent.append(occurrence)
+            if len(recent) > self.limit:
+                recent.pop(0)
+        if self.mode == "drop" or not recent:
+            return [], missed, latest
+        if self.mode == "coalesce":
+            return recent[-1:], missed, latest
+        return recent, missed, latest
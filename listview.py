@@ -0,0 +1,188 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualNotificationList:
+    """Treeview that only materializes the rows currently in view.
+
+    The model is an ordered list of notification ids plus their row values.
+    Treeview items use the notification id as their iid, so selection is
+    independent of position. Changing one notification touches at most one
+    Treeview item; scrolling re-renders only the visible window.
+    """
+
+    def __init__(self, parent, columns, row_values, height=10):
+        """`columns` is a list of (name, heading, width); `row_values(notif)`
+        returns the tuple shown for a notification"""
+        self.row_values = row_values
+        self.height = height
+        self._order = []  # ids in display order
+        self._values = {}  # id -> row values
+        self._top = 0
+        self._selected = None
+        self._select_callbacks = []
+
+        self._build(parent, columns)
+
+    def _build(self, parent, columns):
+        self.frame = ttk.Frame(parent)
+        names = [name for name, _, _ in columns]
+        self.tree = ttk.Treeview(self.frame, columns=names, show='headings',
+                                 height=self.height, selectmode='browse')
+        for name, heading, width in columns:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.frame.columnconfigure(0, weight=1)
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self._move_selection(1))
+
+    def grid(self, **kwargs):
+        self.frame.grid(**kwargs)
+
+    def bind_select(self, callback):
+        """`callback(event)` runs when a different notification gets selected"""
+        self._select_callbacks.append(callback)
+
+    def __len__(self):
+        return len(self._order)
+
+    def set_items(self, notifs):
+        """Replace the whole model (initial load or a new filter result)"""
+        self._order = [notif["id"] for notif in notifs]
+        self._values = {notif["id"]: tuple(self.row_values(notif)) for notif in notifs}
+        if self._selected not in self._values:
+            self._selected = None
+        self._top = min(self._top, self._max_top())
+        self._render()
+
+    def upsert(self, notif):
+        """Add a notification at the end, or refresh its row in place"""
+        notification_id = notif["id"]
+        values = tuple(self.row_values(notif))
+        if notification_id in self._values:
+            if self._values[notification_id] == values:
+                return
+            self._values[notification_id] = values
+            if self.tree.exists(notification_id):
+                self.tree.item(notification_id, values=values)
+            return
+        self._order.append(notification_id)
+        self._values[notification_id] = values
+        if len(self._order) - 1 < self._top + self.height:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def extend(self, notifs):
+        """Append many new notifications with a single re-render"""
+        for notif in notifs:
+            if notif["id"] not in self._values:
+                self._order.append(notif["id"])
+            self._values[notif["id"]] = tuple(self.row_values(notif))
+        self._render()
+
+    def remove(self, notification_id):
+        if notification_id not in self._values:
+            return
+        del self._values[notification_id]
+        self._order.remove(notification_id)
+        if self._selected == notification_id:
+            self._selected = None
+        if self.tree.exists(notification_id):
+            self._top = min(self._top, self._max_top())
+            self._render()
+        else:
+            self._top = min(self._top, self._max_top())
+            self._update_scrollbar()
+
+    def selected_id(self):
+        return self._selected
+
+    def clear_selection(self):
+        self._selected = None
+        self.tree.selection_set(())
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, what)"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self._scroll_to(int(float(args[1]) * len(self._order)))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.height
+            self.scroll(step)
+
+    def scroll(self, rows):
+        self._scroll_to(self._top + rows)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, self._max_top()))
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _max_top(self):
+        return max(0, len(self._order) - self.height)
+
+    def _render(self):
+        wanted = self._order[self._top:self._top + self.height]
+        wanted_set = set(wanted)
+        existing = self.tree.get_children()
+        stale = [iid for iid in existing if iid not in wanted_set]
+        if stale:
+            self.tree.delete(*stale)
+        for position, notification_id in enumerate(wanted):
+            if self.tree.exists(notification_id):
+                self.tree.move(notification_id, '', position)
+            else:
+                self.tree.insert('', position, iid=notification_id,
+                                 values=self._values[notification_id])
+        if self._selected in wanted_set:
+            if self.tree.selection() != (self._selected,):
+                self.tree.selection_set(self._selected)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self._order)
+        if total <= self.height:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._top / total, (self._top + self.height) / total)
+
+    def _on_select(self, event):
+        # Re-selecting the same row after a scroll re-render is not a new selection
+        selection = self.tree.selection()
+        if not selection or selection[0] == self._selected:
+            return
+        self._selected = selection[0]
+        for callback in self._select_callbacks:
+            callback(event)
+
+    def _on_mousewheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+
+    def _move_selection(self, step):
+        if not self._order:
+            return 'break'
+        if self._selected in self._values:
+            index = self._order.index(self._selected) + step
+        else:
+            index = self._top
+        index = max(0, min(index, len(self._order) - 1))
+        if index < self._top:
+            self._scroll_to(index)
+        elif index >= self._top + self.height:
+            self._scroll_to(index - self.height + 1)
+        self.tree.selection_set(self._order[index])
+        self.tree.see(self._order[index])
+        return 'break'
@@ -0,0 +1,341 @@
+"""In-process metrics for the engine's hot paths.
+
+Counters, gauges and histograms live in one registry and can be read as
+Prometheus text (`render_prometheus`, served at GET /metrics) or as a JSON
+snapshot (`snapshot`, optionally dumped to a file by `JsonDumper`).
+
+Metrics are off unless enabled with `REGISTRY.enable()` or the
+NOTIFIER_METRICS=1 environment variable. While disabled every update returns
+after a single attribute check, and `Histogram.time()` returns a shared no-op.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+METRICS_ENV = "NOTIFIER_METRICS"
+# Seconds; spans sub-millisecond store writes up to backend timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Seconds between the scheduled occurrence and the actual fire
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(self, name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge(self, name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labels, buckets))
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self._all():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            "timestamp": time.time(),
+            "metrics": {metric.name: {"type": metric.kind, "values": metric.snapshot()}
+                        for metric in self._all()},
+        }
+
+    def reset(self):
+        for metric in self._all():
+            metric.reset()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def _all(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # label values tuple -> value
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _label_text(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def prometheus_lines(self):
+        return [f"{self.name}{self._label_text(key)} {value}" for key, value in self._items()]
+
+    def snapshot(self):
+        return [{"labels": dict(zip(self.labels, key)), "value": value} for key, value in self._items()]
+
+
+class Gauge(Counter):
+    """A value that goes up and down, or is read from `set_function` on demand"""
+
+    kind = "gauge"
+
+    def __init__(self, registry, name, help_text, labels):
+        super().__init__(registry, name, help_text, labels)
+        self._function = None
+
+    def set(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function):
+        """Read the (unlabelled) value from `function()` whenever metrics are collected"""
+        self._function = function
+
+    def _items(self):
+        if self._function is not None:
+            try:
+                return [((), self._function())]
+            except Exception:
+                return []
+        return super()._items()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labels, buckets):
+        super().__init__(registry, name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the last one for +Inf
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        if not self.registry.enabled:
+            return NULL_TIMER
+        return Timer(self, labels)
+
+    def prometheus_lines(self):
+        lines = []
+        for key, (counts, total, count) in self._items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._label_text(key, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+    def snapshot(self):
+        values = []
+        for key, (counts, total, count) in self._items():
+            values.append({
+                "labels": dict(zip(self.labels, key)),
+                "count": count,
+                "sum": total,
+                "buckets": {str(bound): bucket_count
+                            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts)},
+            })
+        return values
+
+    def _items(self):
+        with self._lock:
+            return sorted((key, (list(counts), total, count))
+                          for key, (counts, total, count) in self._values.items())
+
+
+class Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get(METRICS_ENV, "") not in ("", "0"))
+
+# Scheduling
+FIRE_LAG = REGISTRY.histogram("notifier_fire_lag_seconds",
+                              "Delay between an occurrence's scheduled time and when it fired",
+                              buckets=LAG_BUCKETS)
+SCHEDULER_TICK = REGISTRY.histogram("notifier_scheduler_tick_seconds",
+                                    "Time spent popping and firing due occurrences per wake-up")
+SCHEDULED = REGISTRY.gauge("notifier_scheduled_notifications", "Notifications with a pending occurrence")
+FIRED = REGISTRY.counter("notifier_fired_total", "Occurrences fired, by how they were handled",
+                         labels=("outcome",))
+
+# Delivery
+QUEUE_DEPTH = REGISTRY.gauge("notifier_dispatch_queue_depth", "Jobs waiting for a dispatch worker")
+QUEUE_WAIT = REGISTRY.histogram("notifier_dispatch_queue_wait_seconds",
+                                "Time a job spent queued before a worker picked it up")
+BACKEND_LATENCY = REGISTRY.histogram("notifier_backend_latency_seconds",
+                                     "Duration of one delivery attempt", labels=("backend",))
+BACKEND_RESULTS = REGISTRY.counter("notifier_backend_attempts_total",
+                                   "Delivery attempts by backend and result (success, error, timeout)",
+                                   labels=("backend", "result"))
+FALLBACKS = REGISTRY.counter("notifier_backend_fallbacks_total",
+                             "Jobs delivered by a backend other than the first choice", labels=("backend",))
+COALESCED = REGISTRY.counter("notifier_coalesced_total", "Jobs merged into summary notifications")
+RATE_LIMIT_WAIT = REGISTRY.histogram("notifier_rate_limit_wait_seconds",
+                                     "Time spent waiting for a backend's rate limit", labels=("backend",))
+JOBS = REGISTRY.counter("notifier_dispatch_jobs_total",
+                        "Jobs by outcome (delivered, failed, duplicate, dropped)", labels=("outcome",))
+
+# Images and persistence
+IMAGE_LATENCY = REGISTRY.histogram("notifier_image_seconds",
+                                   "Image store and render cache operations", labels=("operation",))
+STORE_LATENCY = REGISTRY.histogram("notifier_store_seconds",
+                                   "Notification store operations", labels=("operation",))
+SOUND_LATENCY = REGISTRY.histogram("notifier_sound_start_seconds",
+                                   "Time from play() until the sound is handed to the sink",
+                                   labels=("sink",))
+
+
+class JsonDumper:
+    """Writes `registry.snapshot()` to `path` every `interval` seconds"""
+
+    def __init__(self, path, interval=60.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.dump()
+
+    def dump(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.registry.snapshot(), f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to write metrics to {self.path}: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+
+def send_prometheus(handler, registry=REGISTRY):
+    """Answer an http.server request with the registry in Prometheus text format"""
+    body = registry.render_prometheus().encode("utf-8")
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def serve(host="127.0.0.1", port=9465, registry=REGISTRY):
+    """Serve GET /metrics on a background thread (for the window; the daemon has its own)"""
+    # Imported here: http.server is slow to import and most runs never serve metrics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                send_prometheus(self, self.server.registry)
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
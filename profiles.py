@@ -0,0 +1,199 @@
+import json
+import os
+import re
+import threading
+
+from engine import (NotifierEngine, NotifierRuntime, DEFAULT_PROFILE, STORAGE_PATH,
+                    IMAGE_STORE_PATH, LEGACY_JSON_PATH)
+from ledger import LEDGER_PATH
+
+# Every profile other than the default lives in its own directory under here
+PROFILES_DIR = "profiles"
+SETTINGS_FILE = "settings.json"
+# Per-profile settings; missing or null means "none"
+SETTINGS_FIELDS = ("default_icon", "default_image", "default_sound")
+PROFILE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def validate_profile_name(name):
+    if not isinstance(name, str) or not PROFILE_NAME.match(name):
+        raise ValueError(f"Invalid profile name: {name!r} (use letters, digits, '.', '_' or '-')")
+    return name
+
+
+def profile_paths(name, root=PROFILES_DIR):
+    """Files of a profile. The default profile keeps the original locations
+    in the working directory, so existing data is picked up unchanged."""
+    validate_profile_name(name)
+    if name == DEFAULT_PROFILE:
+        return {
+            "storage": STORAGE_PATH,
+            "images": IMAGE_STORE_PATH,
+            "ledger": LEDGER_PATH,
+            "settings": SETTINGS_FILE,
+            "legacy_json": LEGACY_JSON_PATH,
+        }
+    directory = os.path.join(root, name)
+    return {
+        "storage": os.path.join(directory, STORAGE_PATH),
+        "images": os.path.join(directory, IMAGE_STORE_PATH),
+        "ledger": os.path.join(directory, LEDGER_PATH),
+        "settings": os.path.join(directory, SETTINGS_FILE),
+        "legacy_json": None,
+    }
+
+
+def load_settings(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Ignoring invalid settings in {path}: {str(e)}")
+        return {}
+    return {key: data[key] for key in SETTINGS_FIELDS if data.get(key) and isinstance(data[key], str)}
+
+
+def validate_settings(settings):
+    """Settings are file paths or null; raises ValueError otherwise"""
+    for key, value in settings.items():
+        if key not in SETTINGS_FIELDS:
+            raise ValueError(f"Unknown setting: {key}")
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"Invalid {key}: must be a path or null")
+    return settings
+
+
+def save_settings(path, settings):
+    validate_settings(settings)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def open_profile(name, root=PROFILES_DIR, runtime=None, paths=None, **options):
+    """Engine for one profile, configured from its settings.json.
+
+    Without a `runtime` the engine runs its own scheduler and workers, which
+    is what the window does; ProfileManager shares one runtime instead.
+    `paths` overrides entries of profile_paths().
+    """
+    paths = dict(profile_paths(name, root), **(paths or {}))
+    directory = os.path.dirname(paths["storage"])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    settings = load_settings(paths["settings"])
+    return NotifierEngine(paths["storage"], paths["images"],
+                          default_icon=settings.get("default_icon"),
+                          default_image=settings.get("default_image"),
+                          default_sound=settings.get("default_sound"),
+                          ledger_path=paths["ledger"], legacy_json_path=paths["legacy_json"],
+                          runtime=runtime, profile=name, **options)
+
+
+class ProfileManager:
+    """Opens profiles on demand and runs them all on one NotifierRuntime.
+
+    `options` (catch_up, coalesce_window, ...) apply to every profile's
+    engine; `default_paths` overrides file locations of the default profile.
+    """
+
+    def __init__(self, root=PROFILES_DIR, runtime=None, default_paths=None, **options):
+        self.root = root
+        self.runtime = runtime or NotifierRuntime()
+        self.default_paths = default_paths
+        self.options = options
+        self._engines = {}
+        self._lock = threading.Lock()
+        # name -> lock held while that profile's engine is opened or reopened
+        self._profile_locks = {}
+        self._started = False
+
+    def names(self):
+        """The default profile plus every profile directory under `root`"""
+        names = {DEFAULT_PROFILE} | set(self._engines)
+        try:
+            for entry in os.scandir(self.root):
+                if entry.is_dir() and PROFILE_NAME.match(entry.name):
+                    names.add(entry.name)
+        except FileNotFoundError:
+            pass
+        return sorted(names)
+
+    def get(self, name):
+        """The engine for `name`, creating the profile if it doesn't exist"""
+        validate_profile_name(name)
+        with self._profile_lock(name):
+            return self._open(name)
+
+    def settings(self, name):
+        return load_settings(self._paths(name)["settings"])
+
+    def update_settings(self, name, settings):
+        """Save `settings` and reopen the profile's engine so they take effect"""
+        validate_settings(settings)
+        path = self._paths(name)["settings"]
+        # Held until the new engine is open, so get() can't open a second
+        # engine on the same files while the old one is still stopping
+        with self._profile_lock(name):
+            merged = dict(load_settings(path), **settings)
+            save_settings(path, {key: value for key, value in merged.items() if value})
+            with self._lock:
+                engine = self._engines.pop(name, None)
+            if engine is not None:
+                engine.stop()
+                self._open(name)
+        return self.settings(name)
+
+    def start(self):
+        """Open every existing profile, catch each up, then start firing"""
+        for name in self.names():
+            self.get(name)
+        with self._lock:
+            self._started = True
+            engines = list(self._engines.values())
+        for engine in engines:
+            engine.start()
+        self.runtime.start()
+
+    def stop(self):
+        self.runtime.stop()
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+            self._started = False
+        for engine in engines:
+            engine.stop()
+
+    def _profile_lock(self, name):
+        with self._lock:
+            return self._profile_locks.setdefault(name, threading.Lock())
+
+    def _open(self, name):
+        # Caller holds the profile's lock. Opening (migration, load, catch-up)
+        # can be slow, so the manager lock is only taken to read and publish
+        # the engine; other profiles aren't held up meanwhile.
+        with self._lock:
+            engine = self._engines.get(name)
+        if engine is not None:
+            return engine
+        paths = self.default_paths if name == DEFAULT_PROFILE else None
+        engine = open_profile(name, self.root, self.runtime, paths, **self.options)
+        with self._lock:
+            self._engines[name] = engine
+            # start() starts what is published before it; later ones start here
+            started = self._started
+        if started:
+            engine.start()
+        return engine
+
+    def _paths(self, name):
+        paths = profile_paths(name, self.root)
+        if name == DEFAULT_PROFILE and self.default_paths:
+            paths.update(self.default_paths)
+        return paths
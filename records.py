@@ -0,0 +1,91 @@
+import sys
+from collections.abc import Mapping
+
+# "HH:MM" text for every minute of the day, so reading a time never formats one
+TIME_TEXT = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60))
+_MINUTES = {text: minute for minute, text in enumerate(TIME_TEXT)}
+
+# Fields kept in slots; anything else a notification carries goes to `extra`
+FIELDS = ("id", "title", "message", "time", "repeat", "tz", "sound", "image_hash")
+# Values shared by many reminders are interned so each distinct one is stored once
+INTERNED = frozenset(("title", "repeat", "tz", "sound", "image_hash"))
+_SLOTS = {field: ("minute" if field == "time" else field) for field in FIELDS}
+
+
+class NotificationRecord(Mapping):
+    """Compact, read-only notification.
+
+    Reads like the notification dict it was built from (record["time"],
+    record.get("repeat"), dict(record)), but keeps the time as an integer
+    minute of the day in `minute`, interns repeated strings and holds
+    references such as "image_hash" instead of payloads. Values that don't
+    fit a slot, like an unusual time string or unknown fields, are kept
+    as-is in `extra`, so to_dict() gives back exactly what was stored.
+    """
+
+    __slots__ = ("id", "title", "message", "minute", "repeat", "tz", "sound", "image_hash", "extra")
+
+    def __init__(self, id=None, title=None, message=None, minute=None, repeat=None, tz=None,
+                 sound=None, image_hash=None, extra=None):
+        self.id = id
+        self.title = title
+        self.message = message
+        self.minute = minute
+        self.repeat = repeat
+        self.tz = tz
+        self.sound = sound
+        self.image_hash = image_hash
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        values = {}
+        extra = {}
+        for key, value in data.items():
+            if key == "time":
+                minute = _MINUTES.get(value) if isinstance(value, str) else None
+                if minute is not None:
+                    values["minute"] = minute
+                    continue
+            elif key in _SLOTS and isinstance(value, str):
+                values[key] = sys.intern(value) if key in INTERNED else value
+                continue
+            extra[key] = value
+        return cls(extra=extra, **values)
+
+    def to_dict(self):
+        return dict(self)
+
+    @property
+    def time(self):
+        return TIME_TEXT[self.minute] if self.minute is not None else (self.extra or {}).get("time")
+
+    def __getitem__(self, key):
+        slot = _SLOTS.get(key)
+        if slot is not None:
+            value = getattr(self, slot)
+            if value is not None:
+                return TIME_TEXT[value] if slot == "minute" else value
+        if self.extra is not None:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for field in FIELDS:
+            if getattr(self, _SLOTS[field]) is not None:
+                yield field
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"NotificationRecord({dict(self)!r})"
+
+
+def to_record(notif):
+    """The compact form of a notification dict (records are returned as-is)"""
+    return NotificationRecord.from_dict(notif)
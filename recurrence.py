@@ -0,0 +1,252 @@
+from datetime import datetime, timedelta, date, time as dtime
+from functools import lru_cache
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Values accepted in the "repeat" field of a notification, besides weekly:/once:/cron:
+REPEAT_CHOICES = ("daily", "weekdays", "weekly:mon", "once:YYYY-MM-DD", "cron:*/30 9-17 * * mon-fri")
+
+
+class RecurrenceRule:
+    """Computes occurrences of a reminder as POSIX timestamps.
+
+    `next_after(ts)` returns the first occurrence strictly after `ts`, or
+    None when the rule has no further occurrences. It only looks forward
+    from `ts`, so the scheduler can advance a rule one occurrence at a time.
+    """
+
+    def __init__(self, tz=None):
+        self.tz = tz
+
+    def next_after(self, ts):
+        raise NotImplementedError
+
+    def occurrences_between(self, start, end):
+        """Occurrences in the half-open range (start, end]"""
+        ts = self.next_after(start)
+        while ts is not None and ts <= end:
+            yield ts
+            ts = self.next_after(ts)
+
+    def _local(self, ts):
+        return datetime.fromtimestamp(ts, self.tz) if self.tz else datetime.fromtimestamp(ts)
+
+    def _at(self, day, hour, minute):
+        return datetime.combine(day, dtime(hour, minute), tzinfo=self.tz).timestamp()
+
+
+class DailyRule(RecurrenceRule):
+    def __init__(self, hour, minute, tz=None):
+        super().__init__(tz)
+        self.hour = hour
+        self.minute = minute
+
+    def next_after(self, ts):
+        day = self._local(ts).date()
+        candidate = self._at(day, self.hour, self.minute)
+        if candidate <= ts:
+            candidate = self._at(day + timedelta(days=1), self.hour, self.minute)
+        return candidate
+
+
+class WeeklyRule(RecurrenceRule):
+    """Fires at hour:minute on the given weekdays (0 = Monday)"""
+
+    def __init__(self, weekdays, hour, minute, tz=None):
+        super().__init__(tz)
+        self.weekdays = frozenset(weekdays)
+        self.hour = hour
+        self.minute = minute
+
+    def next_after(self, ts):
+        day = self._local(ts).date()
+        for offset in range(8):
+            current = day + timedelta(days=offset)
+            if current.weekday() in self.weekdays:
+                candidate = self._at(current, self.hour, self.minute)
+                if candidate > ts:
+                    return candidate
+        return None
+
+
+class OneShotRule(RecurrenceRule):
+    def __init__(self, when, tz=None):
+        super().__init__(tz)
+        if when.tzinfo is None and tz is not None:
+            when = when.replace(tzinfo=tz)
+        self.when = when.timestamp()
+
+    def next_after(self, ts):
+        return self.when if self.when > ts else None
+
+
+class CronRule(RecurrenceRule):
+    """Five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields accept `*`, numbers, ranges `a-b`, lists `a,b` and steps `*/n` or
+    `a-b/n`. Day-of-week also accepts mon..sun (0 and 7 are Sunday). As in
+    cron, when both day fields are restricted a day matching either one fires.
+    """
+
+    # Give up after this many years without a match (e.g. "0 0 31 2 *")
+    MAX_YEARS = 5
+
+    def __init__(self, expression, tz=None):
+        super().__init__(tz)
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        dow = _parse_cron_field(fields[4], 0, 7, names=("sun",) + WEEKDAYS[:6])
+        # cron counts Sunday as 0 (or 7); datetime.weekday() counts Monday as 0
+        self.weekdays = frozenset((d - 1) % 7 for d in dow)
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.sorted_minutes = sorted(self.minutes)
+        self.sorted_hours = sorted(self.hours)
+
+    def next_after(self, ts):
+        current = self._local(ts).replace(second=0, microsecond=0, tzinfo=None)
+        current += timedelta(minutes=1)
+        limit = current.year + self.MAX_YEARS
+        while current.year <= limit:
+            if current.month not in self.months:
+                year, month = divmod(current.month, 12)
+                current = datetime(current.year + year, month + 1, 1)
+                continue
+            if not self._day_matches(current.date()):
+                current = datetime.combine(current.date() + timedelta(days=1), dtime())
+                continue
+            if current.hour not in self.hours:
+                hour = _next_in(self.sorted_hours, current.hour)
+                if hour is None:
+                    current = datetime.combine(current.date() + timedelta(days=1), dtime())
+                else:
+                    current = current.replace(hour=hour, minute=0)
+                continue
+            minute = _next_in(self.sorted_minutes, current.minute)
+            if minute is None:
+                current = current.replace(minute=0) + timedelta(hours=1)
+                continue
+            candidate = current.replace(minute=minute, tzinfo=self.tz).timestamp()
+            if candidate > ts:
+                return candidate
+            current += timedelta(minutes=1)
+        return None
+
+    def _day_matches(self, day):
+        dom = day.day in self.days
+        dow = day.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return dom and dow
+        return dom or dow
+
+
+def _next_in(sorted_values, value):
+    """Smallest entry >= value, or None"""
+    for candidate in sorted_values:
+        if candidate >= value:
+            return candidate
+    return None
+
+
+def _parse_cron_field(field, low, high, names=()):
+    values = set()
+    for part in field.lower().split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {field!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = _cron_value(start_str, names), _cron_value(end_str, names)
+        else:
+            start = end = _cron_value(part, names)
+            if step != 1:
+                end = high
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field out of range: {field!r}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+def _cron_value(value, names):
+    if value in names:
+        return names.index(value)
+    return int(value)
+
+
+def parse_time(time_str):
+    """Split an "HH:MM" string into (hour, minute), raising ValueError if invalid"""
+    parsed = datetime.strptime(time_str, "%H:%M")
+    return parsed.hour, parsed.minute
+
+
+def fire_minute(time_str):
+    """Minutes since midnight for an "HH:MM" string, None if it doesn't parse"""
+    try:
+        hour, minute = parse_time(time_str)
+    except (TypeError, ValueError):
+        return None
+    return hour * 60 + minute
+
+
+def get_timezone(name):
+    if not name:
+        return None
+    if ZoneInfo is None:
+        raise ValueError("Timezones need Python 3.9+ (zoneinfo)")
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+@lru_cache(maxsize=4096)
+def parse_rule(repeat, time_str, tz_name=None):
+    """Build the rule for a notification's "repeat", "time" and "tz" fields.
+
+    Rules are immutable, so identical settings share one cached instance no
+    matter how many reminders use them. Raises ValueError on bad input.
+    """
+    tz = get_timezone(tz_name)
+    repeat = (repeat or "daily").strip()
+    kind, _, arg = repeat.partition(":")
+    kind = kind.lower()
+    if kind == "cron":
+        return CronRule(arg.strip(), tz)
+    hour, minute = parse_time(time_str)
+    if kind == "daily":
+        return DailyRule(hour, minute, tz)
+    if kind == "weekdays":
+        return WeeklyRule(range(5), hour, minute, tz)
+    if kind == "weekly":
+        names = [name.strip().lower()[:3] for name in arg.split(",") if name.strip()]
+        if not names or any(name not in WEEKDAYS for name in names):
+            raise ValueError(f"Invalid weekly rule: {repeat!r} (use e.g. weekly:mon,thu)")
+        return WeeklyRule([WEEKDAYS.index(name) for name in names], hour, minute, tz)
+    if kind == "once":
+        try:
+            day = date.fromisoformat(arg.strip())
+        except ValueError:
+            raise ValueError(f"Invalid date in {repeat!r} (use once:YYYY-MM-DD)")
+        return OneShotRule(datetime.combine(day, dtime(hour, minute)), tz)
+    raise ValueError(f"Unknown repeat rule: {repeat!r}")
+
+
+def rule_for(notif):
+    return parse_rule(notif.get("repeat"), notif["time"], notif.get("tz"))
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Windows notifications work best with images around 364x180 pixels
+NOTIFICATION_IMAGE_SIZE = (364, 180)
+CACHE_DIR = os.path.join("cache", "render")
+# Total size of rendered variants kept on disk before the least recently used go
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def fit_notification_size(width, height, box=NOTIFICATION_IMAGE_SIZE):
+    """Scale to 180px high, or 364px wide for images wider than 2:1"""
+    aspect_ratio = width / height
+    if aspect_ratio > box[0] / box[1]:
+        new_width = box[0]
+        new_height = int(new_width / aspect_ratio)
+    else:
+        new_height = box[1]
+        new_width = int(new_height * aspect_ratio)
+    return max(new_width, 1), max(new_height, 1)
+
+
+def render_png(src, dst, size):
+    """Convert to PNG and resize to fit the notification image box"""
+    from PIL import Image
+    with Image.open(src) as img:
+        img = img.convert('RGBA')
+        img = img.resize(fit_notification_size(img.width, img.height, size), Image.Resampling.LANCZOS)
+        img.save(dst, 'PNG')
+
+
+def render_ico(src, dst, size):
+    from PIL import Image
+    with Image.open(src) as img:
+        if size:
+            img.save(dst, format='ICO', sizes=[size])
+        else:
+            img.save(dst, format='ICO')
+
+
+RENDERERS = {"png": render_png, "ico": render_ico}
+
+
+class RenderCache:
+    """Disk cache of rendered image variants with size-bounded LRU eviction.
+
+    Variants are keyed by the SHA-256 of the source file plus the target
+    format and size, so picking the same picture again (from any path) is a
+    cache hit that skips Pillow entirely. Source hashes are remembered per
+    (path, mtime, size) so a hit doesn't even re-read the source file.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._total = 0
+        self._source_hashes = {}  # (path, mtime, size) -> sha256
+        self._load()
+
+    def render(self, src, fmt, size=None):
+        """Return the path of `src` rendered as `fmt` ("png" or "ico") at `size`"""
+        renderer = RENDERERS[fmt]
+        start = time.perf_counter()
+        name = self._variant_name(self.source_hash(src), fmt, size)
+        path = os.path.join(self.root, name)
+        with self._lock:
+            if name in self._entries and os.path.exists(path):
+                self._entries.move_to_end(name)
+                self.hits += 1
+                metrics.IMAGE_LATENCY.observe(time.perf_counter() - start, operation="render_hit")
+                return path
+            self.misses += 1
+
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix="." + fmt, dir=self.root, prefix=".render-")
+        os.close(fd)
+        try:
+            renderer(src, tmp_path, size)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self._add(name, os.path.getsize(path))
+            self._evict(keep=name)
+        metrics.IMAGE_LATENCY.observe(time.perf_counter() - start, operation="render")
+        return path
+
+    def source_hash(self, src):
+        stat = os.stat(src)
+        key = (os.path.abspath(src), stat.st_mtime_ns, stat.st_size)
+        digest = self._source_hashes.get(key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(src, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._source_hashes[key] = digest
+        return digest
+
+    def clear(self):
+        with self._lock:
+            for name in list(self._entries):
+                self._remove(name)
+
+    def _variant_name(self, digest, fmt, size):
+        suffix = f"{size[0]}x{size[1]}" if size else "orig"
+        return f"{digest}_{suffix}.{fmt}"
+
+    def _load(self):
+        """Index existing variants, oldest access first, and drop leftovers"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        found = []
+        for name in names:
+            path = os.path.join(self.root, name)
+            if name.startswith(".render-"):
+                # Interrupted render from a previous run
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._add(name, size)
+        with self._lock:
+            self._evict()
+
+    def _add(self, name, size):
+        if name in self._entries:
+            self._total -= self._entries[name]
+        self._entries[name] = size
+        self._total += size
+
+    def _remove(self, name):
+        self._total -= self._entries.pop(name)
+        try:
+            os.unlink(os.path.join(self.root, name))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep=None):
+        while self._total > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            if name == keep:
+                if len(self._entries) == 1:
+                    return
+                self._entries.move_to_end(name)
+                continue
+            self._remove(name)
@@ -0,0 +1,112 @@
+import threading
+
+from records import to_record
+
+# Number of copy-on-write shards; an edit copies one shard, not every notification
+SHARDS = 64
+
+
+class Snapshot:
+    """Immutable view of every notification at one version.
+
+    Readers get a snapshot once and use it without locks; it never changes,
+    even while writers publish newer versions. Notifications are read-only
+    NotificationRecords (copy them with dict() before changing anything) and
+    iterate in creation order.
+    """
+
+    __slots__ = ("version", "_shards", "_order")
+
+    def __init__(self, version, shards, order):
+        self.version = version
+        self._shards = shards  # tuple of dicts: id -> notification
+        self._order = order  # tuple of ids in creation order
+
+    def get(self, notification_id, default=None):
+        return self._shard(notification_id).get(notification_id, default)
+
+    def __getitem__(self, notification_id):
+        return self._shard(notification_id)[notification_id]
+
+    def __contains__(self, notification_id):
+        return notification_id in self._shard(notification_id)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def values(self):
+        shards = self._shards
+        count = len(shards)
+        return [shards[hash(notification_id) % count][notification_id] for notification_id in self._order]
+
+    def _shard(self, notification_id):
+        return self._shards[hash(notification_id) % len(self._shards)]
+
+
+class NotificationRepository:
+    """Notifications published as a series of immutable snapshots.
+
+    Writers are serialized by a lock and build the next version by copying
+    only the shards they touch; publishing is a single reference swap, so
+    readers such as the scheduler thread never block on, or see half of,
+    an edit.
+    """
+
+    def __init__(self, notifications=(), shards=SHARDS):
+        self._lock = threading.Lock()
+        buckets = [{} for _ in range(shards)]
+        order = {}
+        for notif in notifications:
+            buckets[hash(notif["id"]) % shards][notif["id"]] = to_record(notif)
+            order[notif["id"]] = None
+        self._snapshot = Snapshot(0, tuple(buckets), tuple(order))
+
+    def snapshot(self):
+        return self._snapshot
+
+    def get(self, notification_id):
+        return self._snapshot.get(notification_id)
+
+    def apply(self, upserts=(), deletes=()):
+        """Publish a version with `upserts` added or replaced and `deletes` removed.
+
+        Replaced notifications keep their place in the order, which is only
+        rebuilt when notifications are added or removed. Returns the new
+        snapshot.
+        """
+        with self._lock:
+            current = self._snapshot
+            shards = list(current._shards)
+            copied = set()
+            added = []
+            removed = set()
+
+            def writable(notification_id):
+                index = hash(notification_id) % len(shards)
+                if index not in copied:
+                    shards[index] = dict(shards[index])
+                    copied.add(index)
+                return shards[index]
+
+            for notif in upserts:
+                shard = writable(notif["id"])
+                if notif["id"] not in shard:
+                    added.append(notif["id"])
+                shard[notif["id"]] = to_record(notif)
+            for notification_id in deletes:
+                if notification_id in shards[hash(notification_id) % len(shards)]:
+                    del writable(notification_id)[notification_id]
+                    removed.add(notification_id)
+
+            order = current._order
+            if removed:
+                # An id added and removed in the same call is in neither
+                order = tuple(notification_id for notification_id in order + tuple(added)
+                              if notification_id not in removed)
+            elif added:
+                order += tuple(added)
+            self._snapshot = Snapshot(current.version + 1, tuple(shards), order)
+            return self._snapshot
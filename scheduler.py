@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import threading
+import time
+
+import metrics
+
+
+class NotificationScheduler:
+    """Min-heap of next fire times that sleeps until the earliest due entry.
+
+    Every scheduled key owns a `next_fire(after)` callable returning the next
+    occurrence timestamp strictly after `after` (or None when it never fires
+    again), typically `RecurrenceRule.next_after`. The heap therefore holds
+    exactly one precomputed next occurrence per reminder. When an occurrence
+    comes due the scheduler calls `on_fire(key, occurrence)` once and asks
+    the callable for the following one. `on_wake(now)`, if given, is called
+    every time the thread wakes up.
+    """
+
+    # Upper bound for a single wait so wall clock jumps (sleep, NTP) are noticed
+    MAX_WAIT = 60.0
+
+    def __init__(self, on_fire, clock=time.time, on_wake=None):
+        self.on_fire = on_fire
+        self.on_wake = on_wake
+        self.clock = clock
+        self._heap = []  # (fire_ts, seq, key)
+        self._entries = {}  # key -> (seq, next_fire)
+        self._last_fired = {}  # key -> last delivered occurrence
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def schedule(self, key, next_fire, after=None):
+        """Add or replace the entry for `key` and wake the scheduler thread"""
+        with self._cond:
+            if after is None:
+                after = self.clock()
+            last = self._last_fired.get(key)
+            if last is not None and last > after:
+                after = last
+            self._push(key, next_fire, after)
+            self._compact()
+            self._changed()
+
+    def unschedule(self, key):
+        """Drop `key`; its heap slot is discarded lazily when popped"""
+        with self._cond:
+            if self._entries.pop(key, None) is not None:
+                self._last_fired.pop(key, None)
+                self._compact()
+                self._changed()
+
+    def clear(self):
+        with self._cond:
+            self._heap.clear()
+            self._entries.clear()
+            self._last_fired.clear()
+            self._changed()
+
+    def next_deadline(self):
+        """Timestamp of the earliest live entry, or None if nothing is scheduled"""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Pop every occurrence due at `now` and reschedule its successor.
+
+        Returns a list of (key, occurrence). Each occurrence is returned at most
+        once, even if the entry is rescheduled to the same time in between.
+        """
+        due = []
+        with self._cond:
+            if now is None:
+                now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                fire_ts, seq, key = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+                if entry is None or entry[0] != seq:
+                    continue
+                next_fire = entry[1]
+                del self._entries[key]
+                last = self._last_fired.get(key)
+                if last is None or fire_ts > last:
+                    self._last_fired[key] = fire_ts
+                    due.append((key, fire_ts))
+                self._push(key, next_fire, max(fire_ts, now))
+        return due
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def run(self):
+        """Scheduler loop: sleep until the next deadline, then fire what is due"""
+        while True:
+            if self.on_wake:
+                try:
+                    self.on_wake(self.clock())
+                except Exception as e:
+                    print(f"Scheduler wake hook failed: {str(e)}")
+            with self._cond:
+                if not self._running:
+                    return
+                self._drop_stale()
+                if self._heap:
+                    timeout = min(self._heap[0][0] - self.clock(), self.MAX_WAIT)
+                else:
+                    timeout = self.MAX_WAIT
+                if timeout > 0:
+                    self._cond.wait(timeout)
+                    continue
+            with metrics.SCHEDULER_TICK.time():
+                for key, occurrence in self.pop_due():
+                    try:
+                        self.on_fire(key, occurrence)
+                    except Exception as e:
+                        print(f"Failed to fire notification {key}: {str(e)}")
+
+    def _changed(self):
+        # Called with the lock held whenever the earliest deadline may have moved
+        self._cond.notify()
+
+    def _push(self, key, next_fire, after):
+        fire_ts = next_fire(after)
+        if fire_ts is None:
+            self._entries.pop(key, None)
+            return
+        seq = next(self._seq)
+        self._entries[key] = (seq, next_fire)
+        heapq.heappush(self._heap, (fire_ts, seq, key))
+
+    def _drop_stale(self):
+        while self._heap:
+            fire_ts, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        # Rebuild once dead slots outnumber live ones so the heap stays O(n)
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [item for item in self._heap
+                          if item[2] in self._entries and self._entries[item[2]][0] == item[1]]
+            heapq.heapify(self._heap)
@@ -0,0 +1,167 @@
+import bisect
+import re
+
+from records import NotificationRecord
+from recurrence import fire_minute
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+SORT_ORDERS = ("created", "time", "title")
+
+
+def tokenize(text):
+    return {token.casefold() for token in TOKEN.findall(text or "")}
+
+
+def _fields(notif):
+    """(id, title, message, minute, image_hash) of a notification"""
+    if isinstance(notif, NotificationRecord):
+        # Straight from the slots; going through Mapping.get costs several calls each
+        return notif.id, notif.title, notif.message, notif.minute, notif.image_hash
+    return (notif["id"], notif.get("title"), notif.get("message"), fire_minute(notif.get("time")),
+            notif.get("image_hash"))
+
+
+class NotificationIndex:
+    """In-memory indexes for searching and filtering notifications.
+
+    Keeps an inverted index from title/message tokens to ids, a list of
+    (minute of day, creation order, id) kept sorted for time ranges and
+    ordering, and the set of ids with an image. Every change updates only
+    the entries of the notification involved.
+
+    Query words match tokens by prefix, so results follow the search box as
+    the user types; all words must match.
+    """
+
+    def __init__(self, notifications=()):
+        self._postings = {}  # token -> set of ids
+        self._vocabulary = []  # sorted tokens, for prefix lookups
+        self._by_time = []  # sorted (minute, seq, id)
+        self._with_image = set()
+        self._docs = {}  # id -> (tokens, time key, title key)
+        self._seq = 0
+        self.add_many(notifications)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, notif):
+        """Index `notif`, replacing what was indexed for its id before"""
+        self.add_many([notif])
+
+    def add_many(self, notifs):
+        # The last version of each id wins
+        docs = list({fields[0]: fields for fields in map(_fields, notifs)}.values())
+        # One sort per batch instead of an insort per entry once batches get big
+        bulk = len(docs) > 16
+        new_tokens = []
+        new_times = []
+        for notification_id, title, message, minute, image_hash in docs:
+            previous = self._docs.get(notification_id)
+            if previous is not None:
+                # Keeps its slot in _docs, which stays in creation order
+                seq = previous[1][1]
+                self._unindex(notification_id, previous)
+            else:
+                self._seq += 1
+                seq = self._seq
+
+            tokens = tokenize(title) | tokenize(message)
+            for token in tokens:
+                ids = self._postings.get(token)
+                if ids is None:
+                    ids = self._postings[token] = set()
+                    if bulk:
+                        new_tokens.append(token)
+                    else:
+                        bisect.insort(self._vocabulary, token)
+                ids.add(notification_id)
+
+            time_key = (minute if minute is not None else 24 * 60, seq, notification_id)
+            if bulk:
+                new_times.append(time_key)
+            else:
+                bisect.insort(self._by_time, time_key)
+            if image_hash:
+                self._with_image.add(notification_id)
+            self._docs[notification_id] = (tokens, time_key, (title or "").casefold())
+        if new_tokens:
+            self._vocabulary.extend(new_tokens)
+            self._vocabulary.sort()
+        if new_times:
+            self._by_time.extend(new_times)
+            self._by_time.sort()
+
+    def remove(self, notification_id):
+        doc = self._docs.pop(notification_id, None)
+        if doc is not None:
+            self._unindex(notification_id, doc)
+
+    def _unindex(self, notification_id, doc):
+        tokens, time_key, _ = doc
+        for token in tokens:
+            ids = self._postings[token]
+            ids.discard(notification_id)
+            if not ids:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+        del self._by_time[bisect.bisect_left(self._by_time, time_key)]
+        self._with_image.discard(notification_id)
+
+    def query(self, text="", time_from=None, time_to=None, has_image=None, sort="created"):
+        """Ids matching every given filter, ordered by `sort`.
+
+        `time_from`/`time_to` are inclusive minutes of the day (a range like
+        22:00-02:00 wraps past midnight); `has_image` True or False filters on
+        an attached image, None ignores it.
+        """
+        candidates = None
+        for word in tokenize(text):
+            ids = self._prefix_ids(word)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if has_image is True:
+            candidates = set(self._with_image) if candidates is None else candidates & self._with_image
+        elif has_image is False and candidates is not None:
+            candidates -= self._with_image
+
+        ranged = time_from is not None or time_to is not None
+        if sort == "time" or ranged:
+            time_from = time_from if time_from is not None else 0
+            time_to = time_to if time_to is not None else 24 * 60
+            if time_from <= time_to:
+                window = self._time_window(time_from, time_to)
+            else:
+                window = self._time_window(time_from, 24 * 60) + self._time_window(0, time_to)
+            if sort != "time":
+                window.sort(key=lambda key: key[1])
+            result = [key[2] for key in window
+                      if (candidates is None or key[2] in candidates)
+                      and not (has_image is False and key[2] in self._with_image)]
+        elif candidates is None:
+            result = list(self._docs)
+            if has_image is False:
+                result = [notification_id for notification_id in result if notification_id not in self._with_image]
+        elif len(candidates) * 8 < len(self._docs):
+            result = sorted(candidates, key=lambda notification_id: self._docs[notification_id][1][1])
+        else:
+            result = [notification_id for notification_id in self._docs if notification_id in candidates]
+
+        if sort == "title":
+            result.sort(key=lambda notification_id: self._docs[notification_id][2])
+        return result
+
+    def _time_window(self, first, last):
+        lo = bisect.bisect_left(self._by_time, (first,))
+        hi = bisect.bisect_left(self._by_time, (last + 1,))
+        return self._by_time[lo:hi]
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        vocabulary = self._vocabulary
+        index = bisect.bisect_left(vocabulary, prefix)
+        while index < len(vocabulary) and vocabulary[index].startswith(prefix):
+            ids |= self._postings[vocabulary[index]]
+            index += 1
+        return ids
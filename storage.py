@@ -0,0 +1,392 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import metrics
+
+# Edits are written to the store once none arrived for this many seconds...
+WRITE_DELAY = 0.5
+# ...or at the latest this long after the first one of a batch
+MAX_WRITE_DELAY = 5.0
+
+
+def new_id():
+    """Stable identifier for a notification"""
+    return uuid.uuid4().hex
+
+
+class NotificationStore:
+    """Persistence interface for notifications keyed by their "id" field"""
+
+    def load(self):
+        """Return every stored notification as a list of dicts"""
+        raise NotImplementedError
+
+    def add(self, notif):
+        self.add_many([notif])
+
+    def add_many(self, notifs):
+        raise NotImplementedError
+
+    def update(self, notif):
+        raise NotImplementedError
+
+    def delete(self, notification_id):
+        raise NotImplementedError
+
+    def apply(self, upserts=(), deletes=()):
+        """Add or replace `upserts` and remove `deletes` in one batch"""
+        for notif in upserts:
+            self.update(notif)
+        for notification_id in deletes:
+            self.delete(notification_id)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonNotificationStore(NotificationStore):
+    """The original notifications.json format: the whole list in one file"""
+
+    def __init__(self, path="notifications.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._notifications = None
+
+    def load(self):
+        with self._lock:
+            self._notifications = self._read()
+            return [dict(notif) for notif in self._notifications]
+
+    def add_many(self, notifs):
+        self.apply(upserts=notifs)
+
+    def update(self, notif):
+        self.apply(upserts=[notif])
+
+    def delete(self, notification_id):
+        self.apply(deletes=[notification_id])
+
+    def apply(self, upserts=(), deletes=()):
+        """Replace notifications with the same id in place, append new ones,
+        then rewrite the file once"""
+        with self._lock:
+            items = self._cached()
+            positions = {notif.get("id"): i for i, notif in enumerate(items)}
+            for notif in upserts:
+                i = positions.get(notif["id"])
+                if i is None:
+                    positions[notif["id"]] = len(items)
+                    items.append(dict(notif))
+                else:
+                    items[i] = dict(notif)
+            if deletes:
+                deletes = set(deletes)
+                self._notifications = [n for n in items if n.get("id") not in deletes]
+            self._write()
+
+    def _cached(self):
+        if self._notifications is None:
+            self._notifications = self._read()
+        return self._notifications
+
+    def _read(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                notifications = json.load(f)
+            # Files written before notifications had ids get them assigned once
+            missing = [notif for notif in notifications if "id" not in notif]
+            for notif in missing:
+                notif["id"] = new_id()
+            if missing:
+                self._notifications = notifications
+                self._write()
+            return notifications
+        return []
+
+    def _write(self):
+        # A crash mid-write leaves the previous file intact instead of a truncated one
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._notifications, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SqliteNotificationStore(NotificationStore):
+    """Row-per-notification SQLite store.
+
+    Only the row being created, updated or deleted is written. Fields other
+    than the fixed columns are kept in a JSON `extra` column so records
+    round-trip unchanged.
+    """
+
+    COLUMNS = ("id", "title", "message", "time")
+
+    def __init__(self, path="notifications.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS notifications ("
+            " id TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " message TEXT NOT NULL,"
+            " time TEXT NOT NULL,"
+            " extra TEXT)"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, message, time, extra FROM notifications ORDER BY rowid"
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def add_many(self, notifs):
+        rows = [self._to_row(notif) for notif in notifs]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO notifications"
+                " (id, title, message, time, extra) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def update(self, notif):
+        self.add(notif)
+
+    def delete(self, notification_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
+
+    def apply(self, upserts=(), deletes=()):
+        rows = [self._to_row(notif) for notif in upserts]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO notifications"
+                " (id, title, message, time, extra) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.executemany("DELETE FROM notifications WHERE id = ?",
+                                   [(notification_id,) for notification_id in deletes])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _to_row(self, notif):
+        extra = {k: v for k, v in notif.items() if k not in self.COLUMNS}
+        return (
+            notif["id"],
+            notif["title"],
+            notif["message"],
+            notif["time"],
+            json.dumps(extra) if extra else None,
+        )
+
+    def _from_row(self, row):
+        notif = dict(zip(self.COLUMNS, row[:4]))
+        if row[4]:
+            notif.update(json.loads(row[4]))
+        return notif
+
+
+class WriteBehindStore(NotificationStore):
+    """Wraps a store so edits return immediately and are written in batches.
+
+    Each edit is appended to a journal file next to the store and kept in
+    memory; a background thread applies the edits to `store` in one batch
+    once `delay` seconds pass without another edit (or `max_delay` after the
+    first), so bursts of edits cost one write. The journal is replayed if the
+    process dies before that, so an edit is never lost once the call returns.
+    With `fsync` the journal is also synced on every edit, which survives a
+    power cut at the cost of a disk flush per edit.
+
+    close() writes everything still pending.
+    """
+
+    def __init__(self, store, delay=WRITE_DELAY, max_delay=MAX_WRITE_DELAY, journal_path=None, fsync=False):
+        self.store = store
+        self.delay = delay
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self.journal_path = journal_path or store.path + ".pending"
+        self._applying_path = self.journal_path + ".1"
+        self._cond = threading.Condition()
+        self._apply_lock = threading.Lock()
+        self._pending = {}  # id -> notification dict, or None for a delete
+        self._first_edit = self._last_edit = None
+        self._closed = False
+        self._replay()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        self.flush()
+        return len(self.store)
+
+    def load(self):
+        self.flush()
+        return self.store.load()
+
+    def add_many(self, notifs):
+        self.apply(upserts=notifs)
+
+    def update(self, notif):
+        self.apply(upserts=[notif])
+
+    def delete(self, notification_id):
+        self.apply(deletes=[notification_id])
+
+    def apply(self, upserts=(), deletes=()):
+        ops = [(notif["id"], dict(notif)) for notif in upserts]
+        ops += [(notification_id, None) for notification_id in deletes]
+        if not ops:
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Store is closed")
+            self._log(ops)
+            self._pending.update(ops)
+            now = time.monotonic()
+            if self._first_edit is None:
+                self._first_edit = now
+            self._last_edit = now
+            self._cond.notify()
+
+    def flush(self):
+        """Write every pending edit to the store now"""
+        with self._apply_lock:
+            batch = self._take()
+            if batch:
+                self._write(batch)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        with self._cond:
+            self._journal.close()
+        self.store.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return  # close() flushes what is left
+                # Debounce: wait for a quiet moment, but not past max_delay
+                while not self._closed:
+                    deadline = min(self._last_edit + self.delay, self._first_edit + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+    def _take(self):
+        """Detach the pending batch and the journal lines that describe it"""
+        with self._cond:
+            batch = self._pending
+            if not batch:
+                return None
+            self._pending = {}
+            self._first_edit = self._last_edit = None
+            # Until the batch is written, replay would read it from here
+            self._journal.close()
+            os.replace(self.journal_path, self._applying_path)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+            return batch
+
+    def _write(self, batch):
+        upserts = [notif for notif in batch.values() if notif is not None]
+        deletes = [notification_id for notification_id, notif in batch.items() if notif is None]
+        try:
+            with metrics.STORE_LATENCY.time(operation="flush"):
+                self.store.apply(upserts, deletes)
+        except Exception as e:
+            print(f"Failed to save notifications, will retry: {str(e)}")
+            with self._cond:
+                # Edits made since then are newer, so only the rest goes back
+                retry = [(notification_id, notif) for notification_id, notif in batch.items()
+                         if notification_id not in self._pending]
+                self._log(retry)
+                self._pending.update(retry)
+                now = time.monotonic()
+                self._first_edit = self._first_edit or now
+                self._last_edit = now
+                if not self._closed:
+                    self._cond.notify()
+        os.remove(self._applying_path)
+
+    def _log(self, ops):
+        self._journal.write("".join(json.dumps({"id": notification_id, "notification": notif}) + "\n"
+                                    for notification_id, notif in ops))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _replay(self):
+        """Apply edits a previous process journaled but never wrote"""
+        batch = {}
+        for path in (self._applying_path, self.journal_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            op = json.loads(line)
+                        except ValueError:
+                            break  # torn last line of a crashed write
+                        batch[op["id"]] = op["notification"]
+            except FileNotFoundError:
+                continue
+        if batch:
+            print(f"Recovering {len(batch)} unsaved notification edits")
+            upserts = [notif for notif in batch.values() if notif is not None]
+            self.store.apply(upserts, [notification_id for notification_id, notif in batch.items() if notif is None])
+        for path in (self._applying_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def open_store(path):
+    """Pick a backend from the file extension"""
+    if path.endswith(".json"):
+        return JsonNotificationStore(path)
+    return SqliteNotificationStore(path)
+
+
+def migrate_json_to_sqlite(json_path, store):
+    """One-time import of a legacy notifications.json into an empty SQLite store.
+
+    The JSON file is renamed to `<name>.migrated` afterwards so the migration
+    doesn't run again. Returns the number of migrated notifications.
+    """
+    if not isinstance(store, SqliteNotificationStore):
+        return 0
+    if not os.path.exists(json_path) or len(store):
+        return 0
+    legacy = JsonNotificationStore(json_path).load()
+    store.add_many(legacy)
+    os.replace(json_path, json_path + ".migrated")
+    return len(legacy)